@@ -0,0 +1,87 @@
+"""
+Catalog Memory Benchmark
+Compares bytes per SKU of the dict-per-product layout with core-service's ProductCatalog
+
+Usage: python benchmarks/catalog_memory.py [--skus 1000000]
+"""
+import argparse
+import gc
+import importlib.util
+import sys
+import tracemalloc
+from pathlib import Path
+
+SERVICES_DIR = Path(__file__).resolve().parent.parent / 'services'
+CATEGORIES = ['Dairy', 'Bakery', 'Produce', 'Beverages', 'Snacks', 'Meat', 'Vegetables', 'Frozen']
+
+
+def load_core_service():
+    # Services import the shared modules in services/common
+    if str(SERVICES_DIR) not in sys.path:
+        sys.path.insert(0, str(SERVICES_DIR))
+    spec = importlib.util.spec_from_file_location('core_service', SERVICES_DIR / 'core-service' / 'main.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure(build):
+    """Bytes still allocated after build() returns (the result is kept alive while measuring)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return current
+
+
+def build_dict_layout(skus):
+    """Previous layout: products_db dicts, a stock dict, and the list GET /inventory built per request"""
+    products_db = {}
+    stock_db = {}
+    for i in range(skus):
+        product_id = str(i)
+        products_db[product_id] = {
+            'id': product_id,
+            'name': f'Product {i}',
+            'price': 1.0 + (i % 1000) / 100,
+            'category': CATEGORIES[i % len(CATEGORIES)]
+        }
+        stock_db[product_id] = 100
+    inventory = [{
+        'id': product_id,
+        'name': product['name'],
+        'category': product['category'],
+        'price': product['price'],
+        'stock': stock_db[product_id],
+        'reorderLevel': 20
+    } for product_id, product in products_db.items()]
+    return products_db, stock_db, inventory
+
+
+def build_catalog(core, skus):
+    catalog = core.ProductCatalog()
+    for i in range(skus):
+        catalog.add(str(i), f'Product {i}', 1.0 + (i % 1000) / 100, CATEGORIES[i % len(CATEGORIES)])
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--skus', type=int, default=1000000)
+    args = parser.parse_args()
+
+    core = load_core_service()
+    dict_bytes = measure(lambda: build_dict_layout(args.skus))
+    catalog_bytes = measure(lambda: build_catalog(core, args.skus))
+
+    print(f"SKUs:            {args.skus:,}")
+    print(f"dict layout:     {dict_bytes / args.skus:8.1f} bytes/SKU ({dict_bytes / 2**20:,.1f} MiB)")
+    print(f"ProductCatalog:  {catalog_bytes / args.skus:8.1f} bytes/SKU ({catalog_bytes / 2**20:,.1f} MiB)")
+    print(f"reduction:       {dict_bytes / catalog_bytes:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Customer Lookup Benchmark
+Measures GET /api/customers/me latency in customer-mgmt as the customer base grows
+
+Usage: python benchmarks/customer_lookup.py [--sizes 1000,10000,100000,1000000] [--requests 2000]
+
+Token verification is answered locally so only customer-mgmt's own work is timed.
+"""
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SERVICES_DIR = Path(__file__).resolve().parent.parent / 'services'
+
+
+def load_customer_mgmt():
+    # Services import the shared modules in services/common
+    if str(SERVICES_DIR) not in sys.path:
+        sys.path.insert(0, str(SERVICES_DIR))
+    # Keep the benchmark's customers out of the service's real data directory
+    os.environ.setdefault('CUSTOMER_DB_PATH', os.path.join(tempfile.mkdtemp(), 'customers.db'))
+    spec = importlib.util.spec_from_file_location('customer_mgmt', SERVICES_DIR / 'customer-mgmt' / 'main.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def populate(module, size):
+    store = module.customers
+    for i in range(len(store), size):
+        store.add({
+            'id': None, 'email': f'user{i}@example.com', 'name': f'User {i}', 'phone': '', 'address': '',
+            'city': 'Anytown', 'state': 'ST', 'zip': '12345', 'country': 'USA', 'membership_level': 'bronze',
+            'total_orders': 0, 'total_spent': 0.0, 'created_at': '', 'updated_at': ''
+        }, persist=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000')
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    module = load_customer_mgmt()
+    current = {}
+    module.verify_token = lambda token: {'user': {'email': current['email'], 'name': 'Bench'}}
+    client = module.app.test_client()
+    headers = {'Authorization': 'Bearer bench'}
+
+    print(f"{'customers':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        populate(module, size)
+        latencies = []
+        for _ in range(args.requests):
+            current['email'] = f'user{random.randrange(1, size)}@example.com'
+            start = time.perf_counter()
+            response = client.get('/api/customers/me', headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200 and 'id' in response.get_json()
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"{size:>10,} {statistics.median(latencies):>8.3f} {p99:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
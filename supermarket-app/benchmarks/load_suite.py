@@ -0,0 +1,391 @@
+"""
+Multi-Service Load Suite
+Starts all five services on local ports, replays realistic traffic mixes through the UI service
+and reports req/s plus p50/p95/p99 per endpoint
+
+Usage: python benchmarks/load_suite.py [--mix storefront|admin|all] [--duration 20] [--clients 16]
+                                       [--save-baseline benchmarks/baselines/all.json]
+                                       [--baseline benchmarks/baselines/all.json --threshold 0.2]
+
+Each service runs in its own process on the werkzeug threaded server (auth-service included, which
+runs under gunicorn in its image). Prometheus and Grafana are replaced by a stand-in that answers
+every query with an empty result. All traffic enters through ui-service, the way the browser calls it.
+Service logs go to service-logs/ in a temporary directory.
+
+Compare against a baseline recorded on the same machine with the same --mix and --clients: the run
+exits 1 when any endpoint's p95 rises, or its throughput drops, by more than --threshold.
+
+Baselines go in benchmarks/baselines/, one <mix>.json per mix, and are git-ignored. The numbers only
+mean something on the machine that recorded them, so none are checked in: record one with
+--save-baseline on the machine (or CI runner) that will run the comparison, before the change under test.
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+SERVICES_DIR = Path(__file__).resolve().parent.parent / 'services'
+CATEGORIES = ['Dairy', 'Bakery', 'Produce', 'Beverages', 'Snacks', 'Meat', 'Vegetables', 'Frozen']
+ADMIN = ('admin@supermarket.com', 'admin123')
+SHOPPER_PASSWORD = 'bench-password'
+# Endpoints with fewer requests than this in either run are reported but not judged
+MIN_COMPARABLE_REQUESTS = 50
+
+# Production ports shifted by --base-port - 5000
+PORTS = {'bff': 5000, 'core-service': 5001, 'ui-service': 5002, 'auth-service': 5003, 'customer-mgmt': 5004,
+         'prometheus': 9090, 'grafana': 3000}
+
+
+def load_service(name):
+    # Services import the shared modules in services/common
+    if str(SERVICES_DIR) not in sys.path:
+        sys.path.insert(0, str(SERVICES_DIR))
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), SERVICES_DIR / name / 'main.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ==================== Service Processes ====================
+
+def start_auth(module, workdir, options):
+    # Keep benchmark users out of the service's real data directory
+    module.DATA_DIR_PERSIST = workdir / 'auth-data'
+    module.DB_PATH = module.DATA_DIR_PERSIST / 'auth.db'
+    module.AUDIT_LOG = module.DATA_DIR_PERSIST / 'user_actions.log'
+    module.init_db()
+
+
+def start_customer_mgmt(module, workdir, options):
+    module.open_customer_db()
+    for i in range(options['customers']):
+        module.customers.add({
+            'id': None, 'email': f'customer{i}@example.com', 'name': f'Customer {i}', 'phone': '', 'address': '',
+            'city': random.choice(['Springfield', 'Riverton', 'Lakeside']), 'state': 'ST', 'zip': '12345',
+            'country': 'USA', 'membership_level': random.choice(['bronze', 'silver', 'gold']),
+            'total_orders': random.randrange(50), 'total_spent': round(random.uniform(0, 5000), 2),
+            'created_at': '', 'updated_at': ''
+        }, persist=False)
+    module.order_event_consumer.start()
+
+
+def start_ui(module, workdir, options):
+    module.health_prober.start()
+
+
+STARTUP = {'auth-service': start_auth, 'customer-mgmt': start_customer_mgmt, 'ui-service': start_ui}
+
+
+def standin_app():
+    """Answers Prometheus queries with empty vectors and everything else (Grafana, /-/healthy) with 200"""
+    from flask import Flask, jsonify
+    app = Flask('standin')
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>', methods=['GET', 'POST'])
+    def anything(path):
+        if path.startswith('api/v1/query'):
+            return jsonify({'status': 'success', 'data': {'resultType': 'vector', 'result': []}})
+        return jsonify({'status': 'ok'})
+    return app
+
+
+def run_service(name, port, env, workdir, options):
+    """Child process entry point: load one service with the suite's URLs and serve it until killed"""
+    from werkzeug.serving import make_server
+    os.environ.update(env)
+    workdir = Path(workdir)
+    log = open(workdir / 'service-logs' / f'{name}.log', 'a', buffering=1)
+    sys.stdout = sys.stderr = log
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    if name in ('prometheus', 'grafana'):
+        app = standin_app()
+    else:
+        module = load_service(name)
+        if name in STARTUP:
+            STARTUP[name](module, workdir, options)
+        app = module.app
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def start_stack(base_port, workdir, options):
+    ports = {name: port - 5000 + base_port for name, port in PORTS.items()}
+    url = {name: f'http://127.0.0.1:{port}' for name, port in ports.items()}
+    env = {
+        'CORE_SERVICE_URL': url['core-service'], 'AUTH_SERVICE_URL': url['auth-service'],
+        'CUSTOMER_MGMT_URL': url['customer-mgmt'], 'BFF_SERVICE_URL': url['bff'], 'UI_SERVICE_URL': url['ui-service'],
+        'PROMETHEUS_URL': url['prometheus'], 'GRAFANA_URL': url['grafana'],
+        'CUSTOMER_DB_PATH': str(workdir / 'customers.db'),
+    }
+    (workdir / 'service-logs').mkdir()
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=run_service, args=(name, port, env, str(workdir), options), daemon=True)
+                 for name, port in ports.items()]
+    for process in processes:
+        process.start()
+    deadline = time.time() + 60
+    for name in ports:
+        path = '/health' if name not in ('prometheus', 'grafana') else '/'
+        while True:
+            try:
+                if requests.get(url[name] + path, timeout=1).ok:
+                    break
+            except requests.RequestException:
+                pass
+            if time.time() > deadline:
+                raise SystemExit(f'{name} did not become healthy; see {workdir}/service-logs/{name}.log')
+            time.sleep(0.2)
+    return url, processes
+
+
+# ==================== Test Data ====================
+
+def seed(url, products, shoppers):
+    """Load the catalog, register shoppers and log everyone in; returns what the traffic mixes need"""
+    rows = '\n'.join(json.dumps({'name': f'Product {i}', 'price': round(random.uniform(0.5, 40), 2),
+                                 'category': random.choice(CATEGORIES), 'stock': 1_000_000}) for i in range(products))
+    requests.post(f"{url['core-service']}/products/bulk", data=rows,
+                  headers={'Content-Type': 'application/x-ndjson'}, timeout=60).raise_for_status()
+    catalog = requests.get(f"{url['core-service']}/products", params={'limit': products}, timeout=30).json()
+
+    def login(email, password):
+        response = requests.post(f"{url['ui-service']}/api/auth/login", json={'email': email, 'password': password}, timeout=30)
+        response.raise_for_status()
+        return response.json()['token']
+
+    tokens = []
+    for i in range(shoppers):
+        email = f'shopper{i}@example.com'
+        requests.post(f"{url['ui-service']}/api/auth/register",
+                      json={'email': email, 'name': f'Shopper {i}', 'password': SHOPPER_PASSWORD}, timeout=30)
+        tokens.append({'email': email, 'token': login(email, SHOPPER_PASSWORD)})
+    return {'products': [{'id': p['id'], 'name': p['name'], 'price': p['price']} for p in catalog],
+            'shoppers': tokens, 'admin_token': login(*ADMIN)}
+
+
+# ==================== Traffic Mixes ====================
+
+def op_login(session, ui, data, shopper):
+    return session.post(f'{ui}/api/auth/login', json={'email': shopper['email'], 'password': SHOPPER_PASSWORD})
+
+
+def op_browse(session, ui, data, shopper):
+    return session.get(f'{ui}/api/products', params={'offset': random.randrange(0, max(1, len(data['products']) - 50)),
+                                                     'limit': 50})
+
+
+def op_product(session, ui, data, shopper):
+    return session.get(f"{ui}/api/products/{random.choice(data['products'])['id']}")
+
+
+def op_create_order(session, ui, data, shopper):
+    items = [dict(product, quantity=random.randint(1, 3)) for product in random.sample(data['products'], random.randint(1, 4))]
+    return session.post(f'{ui}/api/orders', json={'items': items}, headers={'Authorization': f"Bearer {shopper['token']}"})
+
+
+def op_my_orders(session, ui, data, shopper):
+    return session.get(f'{ui}/api/customers/me/orders', params={'limit': 20},
+                       headers={'Authorization': f"Bearer {shopper['token']}"})
+
+
+def op_admin_customers(session, ui, data, shopper):
+    return session.get(f'{ui}/api/customers', params={'limit': 50, 'sort': '-total_spent'},
+                       headers={'Authorization': f"Bearer {data['admin_token']}"})
+
+
+def op_admin_orders(session, ui, data, shopper):
+    return session.get(f'{ui}/api/orders', params={'limit': 50}, headers={'Authorization': f"Bearer {data['admin_token']}"})
+
+
+def op_admin_users(session, ui, data, shopper):
+    return session.get(f'{ui}/api/users', headers={'Authorization': f"Bearer {data['admin_token']}"})
+
+
+def op_inventory(session, ui, data, shopper):
+    return session.get(f'{ui}/api/inventory', params={'limit': 100})
+
+
+# (endpoint name, weight, operation)
+MIXES = {
+    'storefront': [
+        ('POST /api/auth/login', 5, op_login),
+        ('GET /api/products', 40, op_browse),
+        ('GET /api/products/<id>', 25, op_product),
+        ('POST /api/orders', 15, op_create_order),
+        ('GET /api/customers/me/orders', 15, op_my_orders),
+    ],
+    'admin': [
+        ('GET /api/customers', 30, op_admin_customers),
+        ('GET /api/orders', 30, op_admin_orders),
+        ('GET /api/users', 15, op_admin_users),
+        ('GET /api/inventory', 25, op_inventory),
+    ],
+}
+# Mostly shoppers with some back-office traffic
+MIXES['all'] = [(name, weight * 4, op) for name, weight, op in MIXES['storefront']] + MIXES['admin']
+
+
+def run_clients(mix, ui, data, clients, warmup, duration, first_client):
+    """Load generator process: `clients` threads replaying the mix; returns [(endpoint, latency ms, ok)]"""
+    names, weights, ops = zip(*MIXES[mix])
+    start = time.time() + warmup
+    stop = start + duration
+    results = []
+    lock = threading.Lock()
+
+    def client(index):
+        session = requests.Session()
+        shopper = data['shoppers'][index % len(data['shoppers'])]
+        own = []
+        while True:
+            i = random.choices(range(len(ops)), weights)[0]
+            began = time.time()
+            if began >= stop:
+                break
+            try:
+                ok = ops[i](session, ui, data, shopper).status_code < 400
+            except requests.RequestException:
+                ok = False
+            if began >= start:
+                own.append((names[i], (time.time() - began) * 1000, ok))
+        with lock:
+            results.extend(own)
+
+    threads = [threading.Thread(target=client, args=(first_client + i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+# ==================== Reporting ====================
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def summarize(samples, duration):
+    latencies = sorted(latency for _, latency, _ in samples)
+    errors = sum(1 for _, _, ok in samples if not ok)
+    return {'requests': len(samples), 'errors': errors, 'rps': round(len(samples) / duration, 1),
+            'p50_ms': round(percentile(latencies, 0.50), 2), 'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2)}
+
+
+def report(samples, duration):
+    by_endpoint = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    endpoints = {name: summarize(rows, duration) for name, rows in sorted(by_endpoint.items())}
+    return endpoints, summarize(samples, duration)
+
+
+def print_table(endpoints, total, baseline=None):
+    print(f"{'endpoint':<30} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+          + (f" {'d req/s':>8} {'d p95':>7}" if baseline else ''))
+    for name, stats in list(endpoints.items()) + [('TOTAL', total)]:
+        line = (f"{name:<30} {stats['rps']:>8.1f} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+                f"{stats['p99_ms']:>8.2f} {stats['errors']:>7}")
+        base = baseline and (baseline['total'] if name == 'TOTAL' else baseline['endpoints'].get(name))
+        if base:
+            line += f" {stats['rps'] / base['rps'] - 1:>+8.0%} {stats['p95_ms'] / base['p95_ms'] - 1:>+7.0%}"
+        print(line)
+
+
+def regressions(result, baseline, threshold):
+    """Endpoints whose p95 grew or whose throughput fell by more than threshold (a fraction).
+
+    The overall p95 mixes fast reads with slow logins, so TOTAL is only judged on throughput;
+    endpoints with too few requests in either run to have a stable p95 are skipped.
+    """
+    found = []
+    for name, stats in list(result['endpoints'].items()) + [('TOTAL', result['total'])]:
+        base = baseline['total'] if name == 'TOTAL' else baseline['endpoints'].get(name)
+        if not base or min(base['requests'], stats['requests']) < MIN_COMPARABLE_REQUESTS:
+            continue
+        if name != 'TOTAL' and stats['p95_ms'] > base['p95_ms'] * (1 + threshold):
+            found.append(f"{name}: p95 {base['p95_ms']:.2f}ms -> {stats['p95_ms']:.2f}ms")
+        if stats['rps'] < base['rps'] * (1 - threshold):
+            found.append(f"{name}: throughput {base['rps']:.1f} -> {stats['rps']:.1f} req/s")
+        if stats['errors'] > base['errors'] and stats['errors'] > stats['requests'] * 0.01:
+            found.append(f"{name}: errors {base['errors']} -> {stats['errors']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mix', choices=sorted(MIXES), default='all')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds of traffic before measuring')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent virtual users')
+    parser.add_argument('--client-processes', type=int, default=2,
+                        help='load generator processes, so the client does not share one GIL')
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--customers', type=int, default=10000)
+    parser.add_argument('--base-port', type=int, default=15000)
+    parser.add_argument('--output', help='write this run as JSON')
+    parser.add_argument('--save-baseline', help='write this run as the baseline JSON')
+    parser.add_argument('--baseline', help='compare against this baseline JSON and fail on regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed regression as a fraction (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='supermarket-bench-'))
+    url, processes = start_stack(args.base_port, workdir, {'customers': args.customers})
+    try:
+        data = seed(url, args.products, shoppers=max(1, args.clients))
+        print(f"stack up on ports {args.base_port}-{args.base_port + 4}; mix={args.mix} clients={args.clients} "
+              f"duration={args.duration}s (+{args.warmup}s warmup)")
+        procs = max(1, min(args.client_processes, args.clients))
+        shares = [args.clients // procs + (1 if i < args.clients % procs else 0) for i in range(procs)]
+        with multiprocessing.get_context('spawn').Pool(procs) as pool:
+            jobs = [pool.apply_async(run_clients, (args.mix, url['ui-service'], data, share, args.warmup,
+                                                   args.duration, sum(shares[:i])))
+                    for i, share in enumerate(shares)]
+            samples = [sample for job in jobs for sample in job.get()]
+    finally:
+        for process in processes:
+            process.terminate()
+
+    endpoints, total = report(samples, args.duration)
+    result = {'mix': args.mix, 'clients': args.clients, 'duration': args.duration, 'products': args.products,
+              'customers': args.customers, 'recorded_at': datetime.now().isoformat(timespec='seconds'),
+              'machine': f'{platform.node()} {platform.machine()} python {platform.python_version()}',
+              'endpoints': endpoints, 'total': total}
+
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if (baseline['mix'], baseline['clients']) != (args.mix, args.clients):
+            print(f"warning: baseline was recorded with mix={baseline['mix']} clients={baseline['clients']}")
+    print_table(endpoints, total, baseline)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(result, indent=2) + '\n')
+        print(f'wrote {path}')
+
+    if baseline:
+        found = regressions(result, baseline, args.threshold)
+        if found:
+            print(f'\nREGRESSION (threshold {args.threshold:.0%}):')
+            for line in found:
+                print(f'  {line}')
+            sys.exit(1)
+        print(f'\nno regressions beyond {args.threshold:.0%}')
+
+
+if __name__ == '__main__':
+    main()
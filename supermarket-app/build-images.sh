@@ -15,7 +15,8 @@ APP_NAME=${APP_NAME:-"supermarket-app"}
 build_image() {
     local svc=$1
     echo "Building ${svc}..."
-    docker build -t ${REGISTRY}/${APP_NAME}-${svc}:latest ./services/${svc}
+    # services/ is the build context so every image can copy the shared services/common package
+    docker build -t ${REGISTRY}/${APP_NAME}-${svc}:latest -f ./services/${svc}/Dockerfile ./services
     if [ "$PUSH" == "true" ]; then
         echo "Pushing ${svc} to ${REGISTRY}..."
         docker push ${REGISTRY}/${APP_NAME}-${svc}:latest
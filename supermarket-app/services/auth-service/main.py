@@ -2,13 +2,16 @@
 Authentication Service
 Handles user login, JWT token generation, and user management
 """
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, g
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import jwt
 import os
 from functools import wraps
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Histogram
+from common.compression import init_compression
+from common.profiling import init_profiling
+from common.tracing import init_tracing, start_trace, finish_trace, metrics_response
 import sqlite3
 from pathlib import Path
 import time
@@ -190,15 +193,29 @@ RBAC = {
 request_count = Counter('auth_requests_total', 'Total auth requests', ['endpoint', 'method'])
 request_duration = Histogram('auth_request_duration_seconds', 'Request duration', ['endpoint'])
 
+# ==================== Admin Access ====================
+
+def caller_is_admin():
+    """Whether the request's bearer token is a valid admin token"""
+    token = request.headers.get('Authorization', '').partition(' ')[2]
+    payload = verify_token(token) if token else None
+    return bool(payload) and payload.get('role') == 'admin'
+
+# ==================== Request Tracing ====================
+
+tracer = init_tracing(app, 'auth-service', caller_is_admin)
+
 @app.before_request
 def before_request():
     request.start_time = time.time()
+    start_trace()
 
 @app.after_request
 def after_request(response):
     if hasattr(request, 'start_time'):
         duration = time.time() - request.start_time
-        request_duration.labels(endpoint=request.path).observe(duration)
+        request_duration.labels(endpoint=request.path).observe(duration, exemplar={'trace_id': g.trace_id})
+        finish_trace(response, duration)
     request_count.labels(endpoint=request.path, method=request.method).inc()
     # CORS: allow origins from env var for production; default to '*' for development
     allowed = os.getenv('ALLOWED_ORIGINS', '*')
@@ -207,6 +224,10 @@ def after_request(response):
     response.headers['Access-Control-Allow-Methods'] = 'GET,POST,PUT,DELETE,OPTIONS'
     return response
 
+# ==================== Response Compression ====================
+
+init_compression(app, 'auth')
+
 # Utility functions
 def generate_token(user_id, email, role):
     """Generate JWT token"""
@@ -274,7 +295,7 @@ def health():
 
 @app.route('/metrics', methods=['GET'])
 def metrics():
-    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+    return metrics_response()
 
 @app.route('/api/auth/register', methods=['POST'])
 def register():
@@ -302,7 +323,7 @@ def register():
         log_user_action(email, 'register_self', email, f'role={role}')
 
         return jsonify({
-            'message': 'User registered successfully',
+            'message': 'Registration successful',
             'user': {
                 'id': user_id,
                 'name': name,
@@ -402,24 +423,6 @@ def logout():
     """Logout endpoint (stateless - just returns success)"""
     return jsonify({'message': 'Logged out successfully'}), 200
 
-# ==================== Registration Endpoint ====================
-
-@app.route('/api/auth/register', methods=['POST'])
-def register():
-    """Allow anyone to create a customer account"""
-    data = request.get_json()
-    email = data.get('email')
-    name = data.get('name')
-    password = data.get('password')
-    role = 'customer'
-    if not email or not name or not password:
-        return jsonify({'error': 'Email, name, and password required'}), 400
-    if get_user_by_email(email):
-        return jsonify({'error': 'User already exists'}), 409
-    user_id = create_user_db(email, name, password, role)
-    log_user_action('public', 'register', email)
-    return jsonify({'message': 'Registration successful', 'user': {'id': user_id, 'email': email, 'name': name, 'role': role}}), 201
-
 # ==================== User Management (Admin Only) ====================
 
 @app.route('/api/users', methods=['GET'])
@@ -544,6 +547,10 @@ def get_audit():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ==================== Sampling Profiler ====================
+
+init_profiling(app, tracer.service_name, caller_is_admin)
+
 if __name__ == '__main__':
     # Initialize DB and start service
     init_db()
@@ -2,12 +2,16 @@
 BFF (Backend for Frontend) Service
 Handles client requests and coordinates with core services
 """
-from flask import Flask, jsonify, request
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from flask import Flask, jsonify, request, Response, g, has_request_context
+from prometheus_client import Counter, Gauge, Histogram
+from common.compression import init_compression
+from common.profiling import init_profiling
+from common.tracing import TracedSession, init_tracing, start_trace, finish_trace, metrics_response
 import time
 import requests
 from datetime import datetime
 import os
+from urllib.parse import urlsplit
 
 app = Flask(__name__)
 
@@ -17,36 +21,139 @@ request_duration = Histogram('bff_request_duration_seconds', 'Request duration',
 core_service_calls = Counter('bff_core_service_calls_total', 'Core service calls', ['endpoint'])
 auth_service_calls = Counter('bff_auth_service_calls_total', 'Auth service calls', ['endpoint'])
 customer_mgmt_calls = Counter('bff_customer_mgmt_calls_total', 'Customer mgmt calls', ['endpoint'])
+upstream_duration = Histogram('bff_upstream_request_duration_seconds', 'Time until an upstream call returned its response headers or failed',
+                              ['upstream', 'method', 'route', 'outcome'],
+                              buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60))
+upstream_in_flight = Gauge('bff_upstream_in_flight_requests', 'Upstream calls waiting for a response', ['upstream'])
 
 # Configuration
 CORE_SERVICE_URL = os.getenv('CORE_SERVICE_URL', 'http://core-service:5001')
 AUTH_SERVICE_URL = os.getenv('AUTH_SERVICE_URL', 'http://auth-service:5003')
 CUSTOMER_MGMT_URL = os.getenv('CUSTOMER_MGMT_URL', 'http://customer-mgmt:5004')
 
+# Validators forwarded upstream and headers relayed back for catalog reads
+CONDITIONAL_REQUEST_HEADERS = ('If-None-Match', 'If-Modified-Since')
+CONDITIONAL_RESPONSE_HEADERS = ('ETag', 'Last-Modified', 'X-Catalog-Version')
+
+def proxy_conditional_get(url):
+    """Forward a GET with its cache validators and relay the upstream body, ETag and 304s as-is"""
+    headers = {name: request.headers[name] for name in CONDITIONAL_REQUEST_HEADERS if name in request.headers}
+    response = upstream_session.get(url, headers=headers, params=request.args, timeout=5)
+    relayed = {name: response.headers[name] for name in CONDITIONAL_RESPONSE_HEADERS if name in response.headers}
+    return Response(response.content, response.status_code, relayed, mimetype='application/json')
+
+def verified_user(authorization=None):
+    """The caller's user (email, role, ...) from a verified bearer token, or None for anonymous or invalid tokens.
+
+    The token comes from the Authorization header unless `authorization` is given.
+    """
+    authorization = authorization or request.headers.get('Authorization')
+    if not authorization:
+        return None
+    auth_service_calls.labels(endpoint='verify').inc()
+    try:
+        response = upstream_session.get(f"{AUTH_SERVICE_URL}/api/auth/verify",
+                                        headers={'Authorization': authorization}, timeout=5)
+    except requests.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    return response.json().get('user', {})
+
+def authenticated_email():
+    """Email of the caller's verified bearer token, or None for anonymous or invalid tokens"""
+    return (verified_user() or {}).get('email')
+
+def caller_is_admin():
+    """Whether verified_user() has the admin role; goes through the pooled, metered upstream session"""
+    return (verified_user() or {}).get('role') == 'admin'
+
+# ==================== Request Tracing ====================
+
+tracer = init_tracing(app, 'bff', caller_is_admin)
+
+# ==================== Upstream Instrumentation ====================
+
+UPSTREAMS = {'core': CORE_SERVICE_URL, 'auth': AUTH_SERVICE_URL, 'customer-mgmt': CUSTOMER_MGMT_URL}
+
+def upstream_name(url):
+    for name, base in UPSTREAMS.items():
+        if url.startswith(base):
+            return name
+    return urlsplit(url).netloc
+
+def upstream_outcome(error=None, response=None):
+    """Status class of a response, or the kind of failure that prevented one"""
+    if response is not None:
+        return f'{response.status_code // 100}xx'
+    if isinstance(error, requests.Timeout):  # checked first: ConnectTimeout is also a ConnectionError
+        return 'timeout'
+    if isinstance(error, requests.ConnectionError):
+        return 'connection_error'
+    return 'error'
+
+class UpstreamSession(TracedSession):
+    """Traced session that also times every call per upstream, BFF route and outcome.
+
+    The route is the BFF's own URL rule (e.g. /api/orders/<order_id>) rather than the upstream
+    path, so IDs never become label values.
+    """
+
+    def request(self, method, url, **kwargs):
+        upstream = upstream_name(url)
+        route = request.url_rule.rule if has_request_context() and request.url_rule else 'none'
+        outcome = 'error'
+        upstream_in_flight.labels(upstream=upstream).inc()
+        started = time.time()
+        try:
+            response = super().request(method, url, **kwargs)
+            outcome = upstream_outcome(response=response)
+            return response
+        except Exception as e:
+            outcome = upstream_outcome(error=e)
+            raise
+        finally:
+            upstream_in_flight.labels(upstream=upstream).dec()
+            exemplar = {'trace_id': g.trace_id} if has_request_context() and 'trace_id' in g else None
+            upstream_duration.labels(upstream=upstream, method=method.upper(), route=route,
+                                     outcome=outcome).observe(time.time() - started, exemplar=exemplar)
+
+# Pooled, traced and timed connections for every upstream call
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', '32'))
+upstream_session = UpstreamSession()
+upstream_session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=UPSTREAM_POOL_SIZE))
+upstream_session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=UPSTREAM_POOL_SIZE))
+
 @app.before_request
 def before_request():
     request.start_time = time.time()
+    start_trace()
 
 @app.after_request
 def after_request(response):
     if hasattr(request, 'start_time'):
         duration = time.time() - request.start_time
-        request_duration.labels(method=request.method, endpoint=request.path).observe(duration)
+        request_duration.labels(method=request.method, endpoint=request.path).observe(duration, exemplar={'trace_id': g.trace_id})
+        finish_trace(response, duration)
     request_count.labels(method=request.method, endpoint=request.path).inc()
     # CORS: respect ALLOWED_ORIGINS env var (defaults to '*')
     allowed = os.getenv('ALLOWED_ORIGINS', '*')
     response.headers['Access-Control-Allow-Origin'] = allowed
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization,Idempotency-Key'
     response.headers['Access-Control-Allow-Methods'] = 'GET,POST,PUT,DELETE,OPTIONS'
     return response
 
+# ==================== Response Compression ====================
+
+init_compression(app, 'bff')
+
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy', 'service': 'bff', 'timestamp': datetime.now().isoformat()}), 200
 
 @app.route('/metrics', methods=['GET'])
 def metrics():
-    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+    return metrics_response()
 
 # ==================== Auth Service Proxies ====================
 
@@ -55,7 +162,7 @@ def auth_login():
     """Proxy login request to auth service"""
     try:
         auth_service_calls.labels(endpoint='login').inc()
-        response = requests.post(f"{AUTH_SERVICE_URL}/api/auth/login", json=request.get_json(), timeout=5)
+        response = upstream_session.post(f"{AUTH_SERVICE_URL}/api/auth/login", json=request.get_json(), timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -65,7 +172,7 @@ def auth_register():
     """Proxy registration request to auth service"""
     try:
         auth_service_calls.labels(endpoint='register').inc()
-        response = requests.post(f"{AUTH_SERVICE_URL}/api/auth/register", json=request.get_json(), timeout=5)
+        response = upstream_session.post(f"{AUTH_SERVICE_URL}/api/auth/register", json=request.get_json(), timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -76,17 +183,7 @@ def auth_verify():
     try:
         auth_service_calls.labels(endpoint='verify').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.get(f"{AUTH_SERVICE_URL}/api/auth/verify", headers=headers, timeout=5)
-        return jsonify(response.json()), response.status_code
-    except Exception as e:
-        return jsonify({'error': str(e)}), 503
-
-@app.route('/api/auth/register', methods=['POST'])
-def auth_register():
-    """Proxy registration request to auth service"""
-    try:
-        auth_service_calls.labels(endpoint='register').inc()
-        response = requests.post(f"{AUTH_SERVICE_URL}/api/auth/register", json=request.get_json(), timeout=5)
+        response = upstream_session.get(f"{AUTH_SERVICE_URL}/api/auth/verify", headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -97,7 +194,7 @@ def auth_permissions():
     try:
         auth_service_calls.labels(endpoint='permissions').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.get(f"{AUTH_SERVICE_URL}/api/auth/permissions", headers=headers, timeout=5)
+        response = upstream_session.get(f"{AUTH_SERVICE_URL}/api/auth/permissions", headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -108,7 +205,7 @@ def auth_refresh():
     try:
         auth_service_calls.labels(endpoint='refresh').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.post(f"{AUTH_SERVICE_URL}/api/auth/refresh", headers=headers, timeout=5)
+        response = upstream_session.post(f"{AUTH_SERVICE_URL}/api/auth/refresh", headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -119,7 +216,7 @@ def auth_logout():
     try:
         auth_service_calls.labels(endpoint='logout').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.post(f"{AUTH_SERVICE_URL}/api/auth/logout", headers=headers, timeout=5)
+        response = upstream_session.post(f"{AUTH_SERVICE_URL}/api/auth/logout", headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -132,7 +229,7 @@ def get_users():
     try:
         auth_service_calls.labels(endpoint='get_users').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.get(f"{AUTH_SERVICE_URL}/api/users", headers=headers, timeout=5)
+        response = upstream_session.get(f"{AUTH_SERVICE_URL}/api/users", headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -143,7 +240,7 @@ def create_user():
     try:
         auth_service_calls.labels(endpoint='create_user').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.post(f"{AUTH_SERVICE_URL}/api/users", json=request.get_json(), headers=headers, timeout=5)
+        response = upstream_session.post(f"{AUTH_SERVICE_URL}/api/users", json=request.get_json(), headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -154,7 +251,7 @@ def update_user(user_id):
     try:
         auth_service_calls.labels(endpoint='update_user').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.put(f"{AUTH_SERVICE_URL}/api/users/{user_id}", json=request.get_json(), headers=headers, timeout=5)
+        response = upstream_session.put(f"{AUTH_SERVICE_URL}/api/users/{user_id}", json=request.get_json(), headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -165,7 +262,7 @@ def delete_user(user_id):
     try:
         auth_service_calls.labels(endpoint='delete_user').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.delete(f"{AUTH_SERVICE_URL}/api/users/{user_id}", headers=headers, timeout=5)
+        response = upstream_session.delete(f"{AUTH_SERVICE_URL}/api/users/{user_id}", headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -176,7 +273,7 @@ def get_roles():
     try:
         auth_service_calls.labels(endpoint='get_roles').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.get(f"{AUTH_SERVICE_URL}/api/roles", headers=headers, timeout=5)
+        response = upstream_session.get(f"{AUTH_SERVICE_URL}/api/roles", headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -188,7 +285,7 @@ def proxy_audit():
     try:
         auth_service_calls.labels(endpoint='audit').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.get(f"{AUTH_SERVICE_URL}/api/audit", headers=headers, params=request.args, timeout=5)
+        response = upstream_session.get(f"{AUTH_SERVICE_URL}/api/audit", headers=headers, params=request.args, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -203,9 +300,9 @@ def manage_customer_profile():
         headers = {'Authorization': request.headers.get('Authorization', '')}
         
         if request.method == 'GET':
-            response = requests.get(f"{CUSTOMER_MGMT_URL}/api/customers/me", headers=headers, timeout=5)
+            response = upstream_session.get(f"{CUSTOMER_MGMT_URL}/api/customers/me", headers=headers, timeout=5)
         else:
-            response = requests.put(f"{CUSTOMER_MGMT_URL}/api/customers/me", json=request.get_json(), headers=headers, timeout=5)
+            response = upstream_session.put(f"{CUSTOMER_MGMT_URL}/api/customers/me", json=request.get_json(), headers=headers, timeout=5)
         
         return jsonify(response.json()), response.status_code
     except Exception as e:
@@ -217,18 +314,27 @@ def get_customer(customer_id):
     try:
         customer_mgmt_calls.labels(endpoint='customer_detail').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.get(f"{CUSTOMER_MGMT_URL}/api/customers/{customer_id}", headers=headers, timeout=5)
+        response = upstream_session.get(f"{CUSTOMER_MGMT_URL}/api/customers/{customer_id}", headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
 
 @app.route('/api/customers', methods=['GET'])
 def list_customers():
-    """List all customers"""
+    """List customers (forwards filter, sort and pagination params)"""
     try:
         customer_mgmt_calls.labels(endpoint='list_customers').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.get(f"{CUSTOMER_MGMT_URL}/api/customers", headers=headers, timeout=5)
+        if request.args.get('format') == 'ndjson':
+            # Relay exports line by line instead of buffering them
+            upstream = upstream_session.get(f"{CUSTOMER_MGMT_URL}/api/customers", headers=headers, params=request.args,
+                                            stream=True, timeout=(5, 60))
+            relay = Response(upstream.iter_content(chunk_size=None), upstream.status_code,
+                             mimetype=upstream.headers.get('Content-Type', 'application/x-ndjson'))
+            # Hand the pooled connection back as soon as the client is done, even if it disconnects early
+            relay.call_on_close(upstream.close)
+            return relay
+        response = upstream_session.get(f"{CUSTOMER_MGMT_URL}/api/customers", headers=headers, params=request.args, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -239,7 +345,7 @@ def get_customer_orders():
     try:
         customer_mgmt_calls.labels(endpoint='customer_orders').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.get(f"{CUSTOMER_MGMT_URL}/api/customers/me/orders", headers=headers, timeout=5)
+        response = upstream_session.get(f"{CUSTOMER_MGMT_URL}/api/customers/me/orders", headers=headers, params=request.args, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -250,7 +356,34 @@ def get_loyalty_info():
     try:
         customer_mgmt_calls.labels(endpoint='loyalty').inc()
         headers = {'Authorization': request.headers.get('Authorization', '')}
-        response = requests.get(f"{CUSTOMER_MGMT_URL}/api/customers/me/loyalty", headers=headers, timeout=5)
+        response = upstream_session.get(f"{CUSTOMER_MGMT_URL}/api/customers/me/loyalty", headers=headers, timeout=5)
+        return jsonify(response.json()), response.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 503
+
+@app.route('/api/loyalty/recompute', methods=['POST'])
+def recompute_loyalty():
+    """Trigger a batch loyalty recompute (admin only at customer-mgmt)"""
+    try:
+        customer_mgmt_calls.labels(endpoint='loyalty_recompute').inc()
+        headers = {'Authorization': request.headers.get('Authorization', '')}
+        response = upstream_session.post(f"{CUSTOMER_MGMT_URL}/api/loyalty/recompute", json=request.get_json(silent=True) or {},
+                                         headers=headers, timeout=60)
+        return jsonify(response.json()), response.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 503
+
+@app.route('/api/segments/rfm', methods=['GET', 'POST'])
+def rfm_segments():
+    """Get the last RFM segmentation report or run one (admin only at customer-mgmt)"""
+    try:
+        customer_mgmt_calls.labels(endpoint='rfm_segments').inc()
+        headers = {'Authorization': request.headers.get('Authorization', '')}
+        if request.method == 'POST':
+            response = upstream_session.post(f"{CUSTOMER_MGMT_URL}/api/segments/rfm", json=request.get_json(silent=True) or {},
+                                             headers=headers, timeout=60)
+        else:
+            response = upstream_session.get(f"{CUSTOMER_MGMT_URL}/api/segments/rfm", headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
@@ -263,9 +396,9 @@ def handle_products():
     try:
         core_service_calls.labels(endpoint='products').inc()
         if request.method == 'POST':
-            response = requests.post(f"{CORE_SERVICE_URL}/products", json=request.get_json(), timeout=5)
+            response = upstream_session.post(f"{CORE_SERVICE_URL}/products", json=request.get_json(), timeout=5)
         else:
-            response = requests.get(f"{CORE_SERVICE_URL}/products", timeout=5)
+            return proxy_conditional_get(f"{CORE_SERVICE_URL}/products")
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -275,8 +408,7 @@ def get_inventory():
     """Get inventory information"""
     try:
         core_service_calls.labels(endpoint='inventory').inc()
-        response = requests.get(f"{CORE_SERVICE_URL}/inventory", timeout=5)
-        return jsonify(response.json()), response.status_code
+        return proxy_conditional_get(f"{CORE_SERVICE_URL}/inventory")
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -285,7 +417,24 @@ def get_product(product_id):
     """Get specific product"""
     try:
         core_service_calls.labels(endpoint='product_detail').inc()
-        response = requests.get(f"{CORE_SERVICE_URL}/products/{product_id}", timeout=5)
+        response = upstream_session.get(f"{CORE_SERVICE_URL}/products/{product_id}", timeout=5)
+        return jsonify(response.json()), response.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/orders', methods=['GET'])
+def list_orders():
+    """List orders (supports since, until, status, limit, cursor); customers only see their own"""
+    try:
+        user = verified_user()
+        if user is None:
+            return jsonify({'error': 'Authentication required'}), 401
+        params = request.args.to_dict()
+        if user.get('role') != 'admin':
+            # Only admins may list everyone's orders or filter by another customer's email
+            params['customer_email'] = user.get('email')
+        core_service_calls.labels(endpoint='list_orders').inc()
+        response = upstream_session.get(f"{CORE_SERVICE_URL}/orders", params=params, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -295,21 +444,60 @@ def create_order():
     """Create new order"""
     try:
         core_service_calls.labels(endpoint='orders').inc()
-        data = request.get_json()
-        response = requests.post(f"{CORE_SERVICE_URL}/orders", json=data, timeout=5)
+        data = dict(request.get_json() or {})
+        # Orders belong to the verified caller only; a client-supplied email is never trusted
+        data['customer_email'] = authenticated_email()
+        headers = {}
+        if 'Idempotency-Key' in request.headers:
+            headers['Idempotency-Key'] = request.headers['Idempotency-Key']
+        response = upstream_session.post(f"{CORE_SERVICE_URL}/orders", json=data, headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/orders/events', methods=['GET'])
+def order_events():
+    """Relay the order event stream (server-sent events) without buffering; customers only see their own orders"""
+    # EventSource cannot send headers, so browsers pass their token as ?access_token=
+    token = request.args.get('access_token')
+    user = verified_user(f'Bearer {token}' if token else None)
+    if user is None:
+        return jsonify({'error': 'Authentication required'}), 401
+    params = {'last_event_id': request.args['last_event_id']} if 'last_event_id' in request.args else {}
+    if user.get('role') != 'admin':
+        params['customer_email'] = user.get('email') or ''
+    try:
+        core_service_calls.labels(endpoint='order_events').inc()
+        headers = {'Last-Event-ID': request.headers.get('Last-Event-ID', '')}
+        upstream = upstream_session.get(f"{CORE_SERVICE_URL}/orders/events", headers=headers, params=params, stream=True, timeout=(5, 60))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 503
+
+    def relay():
+        try:
+            for chunk in upstream.iter_content(chunk_size=None):
+                yield chunk
+        except requests.RequestException:
+            pass  # Upstream went quiet or away; the browser reconnects with Last-Event-ID
+        finally:
+            upstream.close()
+
+    return Response(relay(), upstream.status_code, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/orders/<order_id>', methods=['GET'])
 def get_order(order_id):
     """Get order details"""
     try:
         core_service_calls.labels(endpoint='order_detail').inc()
-        response = requests.get(f"{CORE_SERVICE_URL}/orders/{order_id}", timeout=5)
+        response = upstream_session.get(f"{CORE_SERVICE_URL}/orders/{order_id}", timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ==================== Sampling Profiler ====================
+
+init_profiling(app, tracer.service_name, caller_is_admin)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,4 @@
+"""
+Shared Service Modules
+Request plumbing used by every service; each image copies this package next to its main.py
+"""
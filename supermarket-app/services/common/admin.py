@@ -0,0 +1,24 @@
+"""
+Admin Access
+Admin check for services that verify bearer tokens through the auth service
+"""
+from flask import request
+import os
+import requests
+
+from .tracing import TracedSession
+
+AUTH_SERVICE_URL = os.getenv('AUTH_SERVICE_URL', 'http://auth-service:5003')
+# Traced, so each check shows up as a client span to auth-service in the caller's trace
+auth_session = TracedSession()
+
+def caller_is_admin():
+    """Whether the request's bearer token belongs to an admin, as verified by the auth service"""
+    auth = request.headers.get('Authorization')
+    if not auth:
+        return False
+    try:
+        response = auth_session.get(f'{AUTH_SERVICE_URL}/api/auth/verify', headers={'Authorization': auth}, timeout=5)
+    except requests.RequestException:
+        return False
+    return response.status_code == 200 and response.json().get('user', {}).get('role') == 'admin'
@@ -0,0 +1,122 @@
+"""
+Response Compression
+gzip/brotli negotiation for JSON, NDJSON, CSV and plain-text responses
+"""
+from flask import request
+from prometheus_client import Counter, Histogram
+import os
+import time
+import zlib
+
+try:
+    import brotli
+except ImportError:  # only gzip is negotiated without the brotli wheel
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '5'))
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain',
+                          'application/openmetrics-text'}
+
+class CompressionMetrics:
+    """The <prefix>_compression_* series of one service"""
+
+    def __init__(self, prefix):
+        self.bytes = Counter(f'{prefix}_compression_bytes_total', 'Response bytes before and after compression', ['encoding', 'stage'])
+        self.cpu = Counter(f'{prefix}_compression_cpu_seconds_total', 'CPU time spent compressing responses', ['encoding'])
+        self.ratio = Histogram(f'{prefix}_compression_ratio', 'Compressed size as a fraction of the original size', ['encoding'],
+                               buckets=(.05, .1, .15, .2, .3, .4, .5, .6, .8, 1))
+
+class ResponseCompressor:
+    """Incremental gzip or brotli encoder that accounts its bytes and CPU time in the compression metrics"""
+
+    def __init__(self, encoding, metrics):
+        self.encoding = encoding
+        self.metrics = metrics
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress, self._finish = self.compressor.process, self.compressor.finish
+        else:
+            # wbits=31 writes the gzip header and trailer around the deflate stream
+            self.compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+            self._compress, self._finish = self.compressor.compress, self.compressor.flush
+
+    def _timed(self, fn, *args):
+        started = time.thread_time()
+        out = fn(*args)
+        self.metrics.cpu.labels(encoding=self.encoding).inc(time.thread_time() - started)
+        self.compressed_bytes += len(out)
+        return out
+
+    def compress(self, data):
+        self.raw_bytes += len(data)
+        return self._timed(self._compress, data)
+
+    def finish(self):
+        out = self._timed(self._finish)
+        self.metrics.bytes.labels(encoding=self.encoding, stage='original').inc(self.raw_bytes)
+        self.metrics.bytes.labels(encoding=self.encoding, stage='compressed').inc(self.compressed_bytes)
+        if self.raw_bytes:
+            self.metrics.ratio.labels(encoding=self.encoding).observe(self.compressed_bytes / self.raw_bytes)
+        return out
+
+def negotiate_encoding():
+    """Best encoding the client accepts: brotli when available, then gzip, else None"""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def compress_stream(chunks, compressor):
+    """Compress a streamed body chunk by chunk, closing the wrapped iterable when done"""
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            out = compressor.compress(chunk)
+            if out:
+                yield out
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def init_compression(app, metric_prefix):
+    """Compress `app`'s JSON/NDJSON/CSV bodies for clients that advertise gzip or br.
+
+    Register it after the app's metrics hook: after_request hooks run in reverse, so compression
+    then runs first and its cost lands in the request duration.
+    """
+    metrics = CompressionMetrics(metric_prefix)
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code < 200 or response.status_code in (204, 304) or response.direct_passthrough:
+            return response
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+        if response.is_streamed:
+            response.response = compress_stream(response.response, ResponseCompressor(encoding, metrics))
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < COMPRESSION_MIN_BYTES:
+                return response
+            compressor = ResponseCompressor(encoding, metrics)
+            response.set_data(compressor.compress(data) + compressor.finish())
+        response.headers['Content-Encoding'] = encoding
+        # The bytes now differ per encoding, so a strong validator would be wrong; If-None-Match compares weakly
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    return metrics
@@ -0,0 +1,109 @@
+"""
+Sampling Profiler
+On-demand thread-stack sampling and tracemalloc allocation report behind GET /debug/profile
+"""
+from flask import Response, jsonify, request
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+PROFILE_MAX_SECONDS = 60
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL_SECONDS', '0.01'))
+# One profile at a time per process; overlapping samplers would only measure each other
+profile_lock = threading.Lock()
+
+def collapse_stack(frame, thread_name):
+    """A thread's stack as one root-first collapsed line: thread;func (file:line);..."""
+    frames = []
+    while frame is not None:
+        frames.append(f'{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})')
+        frame = frame.f_back
+    frames.append(thread_name)
+    return ';'.join(reversed(frames))
+
+def sample_stacks(seconds, interval):
+    """Sample every other thread's stack until the deadline.
+
+    Returns (samples per collapsed stack, sampling ticks, CPU seconds spent sampling).
+    """
+    own = threading.get_ident()
+    counts = {}
+    ticks = 0
+    cpu_started = time.thread_time()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident != own:
+                stack = collapse_stack(frame, names.get(ident, f'thread-{ident}'))
+                counts[stack] = counts.get(stack, 0) + 1
+        ticks += 1
+        time.sleep(interval)
+    return counts, ticks, time.thread_time() - cpu_started
+
+def top_allocations(snapshot, baseline, limit):
+    """Largest allocation sites still live at the end of the profile (growth since baseline when given)"""
+    # Leave out tracemalloc itself and the sampler's own stack strings
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    for code in (collapse_stack.__code__, sample_stacks.__code__):
+        filters += [tracemalloc.Filter(False, code.co_filename, line) for line in {l for _, _, l in code.co_lines() if l}]
+    snapshot = snapshot.filter_traces(filters)
+    if baseline is None:
+        return [{'location': f'{s.traceback[0].filename}:{s.traceback[0].lineno}', 'size_bytes': s.size, 'count': s.count}
+                for s in snapshot.statistics('lineno')[:limit]]
+    return [{'location': f'{s.traceback[0].filename}:{s.traceback[0].lineno}', 'size_bytes': s.size_diff, 'count': s.count_diff}
+            for s in snapshot.compare_to(baseline.filter_traces(filters), 'lineno')[:limit]]
+
+def run_profile(service_name, seconds, trace_memory, limit):
+    baseline = None
+    started_tracing = False
+    if trace_memory:
+        if tracemalloc.is_tracing():
+            baseline = tracemalloc.take_snapshot()
+        else:
+            tracemalloc.start()
+            started_tracing = True
+    try:
+        counts, ticks, sampler_cpu = sample_stacks(seconds, PROFILE_SAMPLE_INTERVAL)
+        allocations = top_allocations(tracemalloc.take_snapshot(), baseline, limit) if trace_memory else None
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return {'service': service_name, 'seconds': seconds, 'interval_seconds': PROFILE_SAMPLE_INTERVAL,
+            'ticks': ticks, 'samples': sum(counts.values()), 'sampler_cpu_seconds': round(sampler_cpu, 4),
+            'collapsed': ''.join(f'{stack} {n}\n' for stack, n in sorted(counts.items(), key=lambda item: -item[1])),
+            'allocations': allocations}
+
+def init_profiling(app, service_name, is_admin):
+    """Give `app` the opt-in, admin-only GET /debug/profile; `is_admin` checks the current request's token"""
+
+    @app.route('/debug/profile', methods=['GET'])
+    def debug_profile():
+        """Sample all threads for ?seconds=N (default 10, max 60) and report collapsed stacks plus top allocations.
+
+        Opt-in with PROFILING_ENABLED=1 and admin only. format=collapsed returns just the stacks as text
+        for flamegraph.pl / speedscope; memory=0 skips tracemalloc; top limits the allocation list (default 25).
+        """
+        if not PROFILING_ENABLED:
+            return jsonify({'error': 'Profiling is disabled (set PROFILING_ENABLED=1)'}), 404
+        if not is_admin():
+            return jsonify({'error': 'Admin token required'}), 403
+        try:
+            seconds = float(request.args.get('seconds', '10'))
+            limit = int(request.args.get('top', '25'))
+        except ValueError:
+            return jsonify({'error': 'seconds and top must be numbers'}), 400
+        if not 0 < seconds <= PROFILE_MAX_SECONDS or limit < 1:
+            return jsonify({'error': f'seconds must be in (0, {PROFILE_MAX_SECONDS}] and top at least 1'}), 400
+        if not profile_lock.acquire(blocking=False):
+            return jsonify({'error': 'A profile is already running'}), 409
+        try:
+            profile = run_profile(service_name, seconds, request.args.get('memory', '1') != '0', limit)
+        finally:
+            profile_lock.release()
+        if request.args.get('format') == 'collapsed':
+            return Response(profile['collapsed'], mimetype='text/plain')
+        return jsonify(profile), 200
@@ -0,0 +1,108 @@
+"""
+Request Tracing
+W3C traceparent propagation, span recording and per-process trace lookup
+"""
+from flask import current_app, g, has_request_context, jsonify, request
+from prometheus_client import REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.openmetrics.exposition import generate_latest as generate_openmetrics, CONTENT_TYPE_LATEST as OPENMETRICS_CONTENT_TYPE
+from requests.structures import CaseInsensitiveDict
+from collections import deque
+from urllib.parse import urlsplit
+import os
+import re
+import time
+import requests
+
+TRACE_LOG_SPANS = os.getenv('TRACE_LOG_SPANS', '1') == '1'
+TRACE_SPAN_BUFFER = int(os.getenv('TRACE_SPAN_BUFFER', '5000'))
+TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+# Scrapes and probes would drown out real traffic in the span log
+UNTRACED_PATHS = {'/health', '/metrics'}
+
+class Tracer:
+    """Recent spans of one service, kept in memory so a trace can be looked up by id"""
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+        self.spans = deque(maxlen=TRACE_SPAN_BUFFER)
+
+    def record(self, kind, name, span_id, parent_span_id, started, duration, status):
+        """Keep a finished span for lookup and log it as one compact line"""
+        span = {'trace_id': g.trace_id, 'span_id': span_id, 'parent_span_id': parent_span_id,
+                'service': self.service_name, 'kind': kind, 'name': name, 'start': started,
+                'duration_ms': round(duration * 1000, 2), 'status': status}
+        self.spans.append(span)
+        if TRACE_LOG_SPANS:
+            print(f"span trace={g.trace_id} id={span_id} parent={parent_span_id or '-'} svc={self.service_name} "
+                  f"kind={kind} status={status} ms={span['duration_ms']} name=\"{name}\"", flush=True)
+
+    def find(self, trace_id):
+        return [s for s in list(self.spans) if s['trace_id'] == trace_id]
+
+def new_span_id():
+    return os.urandom(8).hex()
+
+def start_trace():
+    """Continue the caller's W3C traceparent, or start a new trace when there is none"""
+    match = TRACEPARENT_RE.match(request.headers.get('traceparent', '').strip().lower())
+    g.trace_id, g.parent_span_id = match.groups() if match else (os.urandom(16).hex(), None)
+    g.span_id = new_span_id()
+
+def record_span(kind, name, span_id, parent_span_id, started, duration, status):
+    """Record a span of the current request in its app's tracer"""
+    current_app.extensions['tracing'].record(kind, name, span_id, parent_span_id, started, duration, status)
+
+def finish_trace(response, duration):
+    """Record the request's server span and return its trace id to the caller"""
+    if request.path not in UNTRACED_PATHS:
+        record_span('server', f'{request.method} {request.path}', g.span_id, g.parent_span_id,
+                    request.start_time, duration, response.status_code)
+    response.headers['X-Trace-Id'] = g.trace_id
+
+class TracedSession(requests.Session):
+    """Session that sends the current trace's traceparent on every call and records it as a client span"""
+
+    def request(self, method, url, **kwargs):
+        if not has_request_context() or 'trace_id' not in g:
+            return super().request(method, url, **kwargs)
+        span_id = new_span_id()
+        headers = CaseInsensitiveDict(kwargs.pop('headers', None) or {})
+        headers['traceparent'] = f'00-{g.trace_id}-{span_id}-01'
+        target = urlsplit(url)
+        started = time.time()
+        status = 'error'
+        try:
+            response = super().request(method, url, headers=headers, **kwargs)
+            status = response.status_code
+            return response
+        except requests.Timeout:
+            status = 'timeout'
+            raise
+        finally:
+            record_span('client', f'{method.upper()} {target.netloc}{target.path}', span_id, g.span_id,
+                        started, time.time() - started, status)
+
+def metrics_response():
+    """Body of GET /metrics in the format the scraper asked for"""
+    # Exemplars (trace ids on latency buckets) are only part of the OpenMetrics format
+    if 'application/openmetrics-text' in request.headers.get('Accept', ''):
+        return generate_openmetrics(REGISTRY), 200, {'Content-Type': OPENMETRICS_CONTENT_TYPE}
+    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
+def init_tracing(app, service_name, is_admin):
+    """Give `app` a span buffer and the admin-only GET /traces/<trace_id> lookup over it.
+
+    The app's own before_request must call start_trace() and its after_request finish_trace(),
+    so the trace id is also at hand for its latency exemplars.
+    """
+    tracer = Tracer(service_name)
+    app.extensions['tracing'] = tracer
+
+    @app.route('/traces/<trace_id>', methods=['GET'])
+    def get_trace(trace_id):
+        """Spans of a trace still held in this process's buffer"""
+        if not is_admin():
+            return jsonify({'error': 'Admin token required'}), 403
+        return jsonify({'trace_id': trace_id, 'spans': tracer.find(trace_id)}), 200
+
+    return tracer
@@ -2,12 +2,28 @@
 Core Service
 Business logic for products, inventory, and orders
 """
-from flask import Flask, jsonify, request
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from flask import Flask, jsonify, request, Response, g
+from prometheus_client import Counter, Gauge, Histogram
+from common.admin import caller_is_admin
+from common.compression import init_compression
+from common.profiling import init_profiling
+from common.tracing import init_tracing, start_trace, finish_trace, metrics_response
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 import random
-import uuid
+import bisect
+import csv
+import hashlib
+import json
+import math
+import queue
+import os
+import socket
+import threading
+import zlib
+from collections import deque, OrderedDict
+from functools import wraps
+import numpy as np
 
 app = Flask(__name__)
 
@@ -16,81 +32,906 @@ request_count = Counter('core_service_requests_total', 'Total requests', ['metho
 request_duration = Histogram('core_service_request_duration_seconds', 'Request duration', ['method', 'endpoint'])
 orders_created = Counter('orders_created_total', 'Total orders created')
 products_queried = Counter('products_queried_total', 'Total product queries')
+order_event_subscribers = Gauge('core_order_event_subscribers', 'Connected order event stream subscribers')
+order_events_published = Counter('core_order_events_published_total', 'Order events published', ['type'])
+order_events_dropped = Counter('core_order_events_dropped_total', 'Order events dropped for slow subscribers')
+bulk_rows = Counter('core_catalog_bulk_rows_total', 'Rows processed by bulk catalog import/export', ['operation', 'result'])
+bulk_throughput = Gauge('core_catalog_bulk_rows_per_second', 'Rows per second of the last bulk catalog import/export', ['operation'])
+idempotency_replays = Counter('core_idempotency_replays_total', 'Requests answered from the idempotency cache')
+idempotency_collisions = Counter('core_idempotency_inflight_collisions_total', 'Duplicate requests that waited on an in-flight original')
+analytics_query_duration = Histogram('core_analytics_query_duration_seconds', 'Sales analytics query duration', ['group_by'])
+
+# Largest value the int32 stock and quantity columns can hold
+INT32_MAX = int(np.iinfo(np.int32).max)
+
+# ==================== Product Catalog ====================
+
+class ProductCatalog:
+    """Array-backed product store: one row per SKU instead of one dict per SKU.
+
+    Categories are dictionary-encoded, prices and stock live in NumPy columns,
+    and product dicts are only materialized when a page is serialized.
+    """
+    PAGE_SIZE = 1000
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.rows = {}  # product id -> row number
+        self.ids = []
+        self.names = []
+        self.category = np.empty(capacity, dtype=np.int32)
+        self.price = np.empty(capacity, dtype=np.float64)
+        self.stock = np.empty(capacity, dtype=np.int32)
+        self.category_codes, self.category_keys = {}, []
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, product_id):
+        return product_id in self.rows
+
+    def _grow(self):
+        capacity = len(self.price) * 2
+        for column in ('category', 'price', 'stock'):
+            old = getattr(self, column)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+
+    def _category_code(self, category):
+        code = self.category_codes.get(category)
+        if code is None:
+            code = self.category_codes[category] = len(self.category_keys)
+            self.category_keys.append(category)
+        return code
+
+    def _append(self, product_id, name, price, category, stock):
+        if self.size == len(self.price):
+            self._grow()
+        row = self.size
+        # NumPy columns first: if a value does not fit, nothing has been appended yet and rows stay aligned
+        self.category[row] = self._category_code(category)
+        self.price[row] = price
+        self.stock[row] = stock
+        self.ids.append(product_id)
+        self.names.append(name)
+        self.rows[product_id] = row
+        self.size += 1
+        return row
+
+    def add(self, product_id, name, price, category, stock=100):
+        price = np.nan if price is None else float(price)
+        if np.isinf(price):
+            raise ValueError('price must be finite')
+        with self.lock:
+            row = self._append(product_id, name, price, category, stock)
+        return self.product(row)
+
+    def upsert_many(self, records):
+        """Insert or update (product_id, name, price, category, stock) records under one lock.
+
+        A None category or stock leaves the existing value of an updated row untouched.
+        """
+        inserted = updated = 0
+        with self.lock:
+            for product_id, name, price, category, stock in records:
+                row = self.rows.get(product_id)
+                if row is None:
+                    self._append(product_id, name, price, category or 'Uncategorized', 100 if stock is None else stock)
+                    inserted += 1
+                    continue
+                self.names[row] = name
+                self.price[row] = price
+                if category is not None:
+                    self.category[row] = self._category_code(category)
+                if stock is not None:
+                    self.stock[row] = stock
+                updated += 1
+        return inserted, updated
+
+    def set_stock(self, product_id, stock):
+        with self.lock:
+            self.stock[self.rows[product_id]] = stock
+
+    def category_of(self, product_id):
+        row = self.rows.get(product_id)
+        return None if row is None else self.category_keys[self.category[row]]
+
+    def _price(self, row):
+        price = self.price[row]
+        return None if np.isnan(price) else float(price)
+
+    def product(self, row):
+        return {
+            'id': self.ids[row],
+            'name': self.names[row],
+            'price': self._price(row),
+            'category': self.category_keys[self.category[row]]
+        }
+
+    def inventory_item(self, row):
+        return {
+            'id': self.ids[row],
+            'name': self.names[row],
+            'category': self.category_keys[self.category[row]],
+            'price': self._price(row),
+            'stock': int(self.stock[row]),
+            'reorderLevel': 20
+        }
+
+    def get(self, product_id):
+        row = self.rows.get(product_id)
+        return None if row is None else self.product(row)
+
+    def export_ndjson(self):
+        """Yield the catalog as NDJSON, one page of rows per chunk"""
+        end = self.size
+        for page_start in range(0, end, self.PAGE_SIZE):
+            lines = []
+            for row in range(page_start, min(page_start + self.PAGE_SIZE, end)):
+                item = self.product(row)
+                item['stock'] = int(self.stock[row])
+                lines.append(json.dumps(item))
+            yield '\n'.join(lines) + '\n'
+
+    def encode(self, view, offset=0, limit=None):
+        """Serialize rows [offset, offset + limit) as a JSON array, one page of dicts at a time"""
+        render = self.product if view == 'products' else self.inventory_item
+        end = self.size if limit is None else min(self.size, offset + limit)
+        chunks = []
+        for page_start in range(offset, end, self.PAGE_SIZE):
+            page = [render(row) for row in range(page_start, min(page_start + self.PAGE_SIZE, end))]
+            chunks.append(app.json.dumps(page)[1:-1])
+        return ('[' + ','.join(chunks) + ']').encode()
 
 # Mock data
-products_db = {
-    '1': {'id': '1', 'name': 'Milk', 'price': 3.99, 'category': 'Dairy'},
-    '2': {'id': '2', 'name': 'Bread', 'price': 2.49, 'category': 'Bakery'},
-    '3': {'id': '3', 'name': 'Cheese', 'price': 4.99, 'category': 'Dairy'},
-    '4': {'id': '4', 'name': 'Apples', 'price': 1.99, 'category': 'Produce'},
-}
+catalog = ProductCatalog()
+catalog.add('1', 'Milk', 3.99, 'Dairy')
+catalog.add('2', 'Bread', 2.49, 'Bakery')
+catalog.add('3', 'Cheese', 4.99, 'Dairy')
+catalog.add('4', 'Apples', 1.99, 'Produce')
 
 orders_db = {}
 
+# ==================== Catalog Versioning ====================
+
+# Bumped on every product or stock change; serialized views are cached per version
+catalog_version = 0
+catalog_modified = datetime.now(timezone.utc)
+catalog_lock = threading.Lock()
+catalog_cache = {}  # (view, offset, limit) -> (version, body bytes, etag)
+CATALOG_CACHE_ENTRIES = 256
+
+def bump_catalog_version():
+    global catalog_version, catalog_modified
+    with catalog_lock:
+        catalog_version += 1
+        catalog_modified = datetime.now(timezone.utc)
+
+def catalog_response(view):
+    """Serve a catalog view with a strong ETag, re-encoding only when the version changed.
+
+    Optional `offset`/`limit` query params select a page; only that page is serialized.
+    """
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    key = (view, offset, limit)
+    version = catalog_version
+    cached = catalog_cache.get(key)
+    if cached is None or cached[0] != version:
+        body = catalog.encode(view, offset, limit)
+        cached = (version, body, hashlib.sha1(body).hexdigest())
+        if len(catalog_cache) >= CATALOG_CACHE_ENTRIES:
+            catalog_cache.clear()
+        catalog_cache[key] = cached
+    response = Response(cached[1], mimetype='application/json')
+    response.set_etag(cached[2])
+    response.last_modified = catalog_modified
+    response.headers['X-Catalog-Version'] = str(cached[0])
+    response.headers['X-Total-Count'] = str(len(catalog))
+    return response.make_conditional(request)
+
+# ==================== Time-ordered IDs ====================
+
+class SnowflakeGenerator:
+    """Monotonic, time-sortable 64-bit IDs: 41 bits ms timestamp | 10 bits node | 12 bits sequence"""
+    EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+    NODE_BITS = 10
+    SEQUENCE_BITS = 12
+
+    def __init__(self, node_id):
+        self.node_id = node_id & ((1 << self.NODE_BITS) - 1)
+        self.last_ms = -1
+        self.sequence = 0
+        self.lock = threading.Lock()
+
+    def next_id(self):
+        with self.lock:
+            now_ms = int(time.time() * 1000)
+            # Never go backwards, even if the wall clock does
+            if now_ms < self.last_ms:
+                now_ms = self.last_ms
+            if now_ms == self.last_ms:
+                self.sequence = (self.sequence + 1) & ((1 << self.SEQUENCE_BITS) - 1)
+                if self.sequence == 0:
+                    # Sequence exhausted for this millisecond, borrow the next one
+                    now_ms = self.last_ms + 1
+            else:
+                self.sequence = 0
+            self.last_ms = now_ms
+            return ((now_ms - self.EPOCH_MS) << (self.NODE_BITS + self.SEQUENCE_BITS)) \
+                | (self.node_id << self.SEQUENCE_BITS) | self.sequence
+
+    @classmethod
+    def timestamp_ms(cls, snowflake_id):
+        """Extract the millisecond timestamp embedded in an ID"""
+        return (snowflake_id >> (cls.NODE_BITS + cls.SEQUENCE_BITS)) + cls.EPOCH_MS
+
+    @classmethod
+    def lower_bound(cls, ts_ms):
+        """Smallest possible ID generated at or after ts_ms"""
+        return max(ts_ms - cls.EPOCH_MS, 0) << (cls.NODE_BITS + cls.SEQUENCE_BITS)
+
+# NODE_ID keeps IDs unique across replicas; fall back to a hostname hash
+NODE_ID = int(os.getenv('NODE_ID', str(zlib.crc32(socket.gethostname().encode()) % 1024)))
+id_generator = SnowflakeGenerator(NODE_ID)
+
+# Sorted lists of integer order IDs (== creation time order) for range queries,
+# one over all orders and one per customer so history lookups never scan everything
+order_index = []
+customer_order_index = {}  # normalized customer email -> sorted order IDs
+order_index_lock = threading.Lock()
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+def index_order(order_id, customer_email=None):
+    with order_index_lock:
+        indexes = [order_index]
+        if customer_email:
+            indexes.append(customer_order_index.setdefault(normalize_email(customer_email), []))
+        for index in indexes:
+            if not index or order_id > index[-1]:
+                index.append(order_id)
+            else:
+                bisect.insort(index, order_id)
+
+def parse_time_param(value):
+    """Parse epoch seconds or an ISO 8601 timestamp into epoch milliseconds"""
+    try:
+        seconds = float(value)
+    except ValueError:
+        return int(datetime.fromisoformat(value).timestamp() * 1000)
+    if not math.isfinite(seconds):
+        raise ValueError(f'{value} is not a finite timestamp')
+    return int(seconds * 1000)
+
+# ==================== Order Event Stream ====================
+
+class OrderEventHub:
+    """In-process fan-out of order events to SSE subscribers with bounded buffers"""
+
+    def __init__(self, history_size=1000, buffer_size=256):
+        self.history = deque(maxlen=history_size)  # recent events kept for Last-Event-ID resume
+        self.buffer_size = buffer_size
+        self.subscribers = set()
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        with self.lock:
+            # The customer is kept beside the payload so per-customer streams can filter without parsing it
+            event = (self.next_id, event_type, json.dumps(data), data.get('customer_email'))
+            self.next_id += 1
+            self.history.append(event)
+            for subscriber in list(self.subscribers):
+                if subscriber.qsize() < self.buffer_size:
+                    subscriber.put_nowait(event)
+                else:
+                    # Disconnect the slow subscriber; it resumes from history via Last-Event-ID
+                    order_events_dropped.inc()
+                    self.subscribers.discard(subscriber)
+                    order_event_subscribers.dec()
+                    subscriber.put_nowait(None)
+        order_events_published.labels(type=event_type).inc()
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber and return it with any events it missed"""
+        # One slot beyond buffer_size is reserved for the disconnect marker
+        subscriber = queue.Queue(maxsize=self.buffer_size + 1)
+        with self.lock:
+            backlog = [e for e in self.history if last_event_id is not None and e[0] > last_event_id]
+            self.subscribers.add(subscriber)
+        order_event_subscribers.inc()
+        return subscriber, backlog
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            if subscriber not in self.subscribers:
+                return
+            self.subscribers.discard(subscriber)
+        order_event_subscribers.dec()
+
+order_events = OrderEventHub()
+
+def format_sse(event):
+    event_id, event_type, data, _ = event
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+# ==================== Sales Analytics ====================
+
+class SalesFactStore:
+    """Append-only columnar store of order line items backed by NumPy arrays"""
+    MAX_CELLS = 2_000_000  # groups x buckets per query; three float64/int64 matrices of this size are built
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.sku = np.empty(capacity, dtype=np.int32)
+        self.category = np.empty(capacity, dtype=np.int32)
+        self.quantity = np.empty(capacity, dtype=np.int32)
+        self.price = np.empty(capacity, dtype=np.float64)
+        self.ts = np.empty(capacity, dtype=np.int64)  # epoch milliseconds
+        # Dictionary encoding: string key -> dense integer code
+        self.sku_codes, self.sku_keys = {}, []
+        self.category_codes, self.category_keys = {}, []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _encode(codes, keys, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(keys)
+            keys.append(value)
+        return code
+
+    def _grow(self, needed):
+        capacity = len(self.ts)
+        while capacity < needed:
+            capacity *= 2
+        for column in ('sku', 'category', 'quantity', 'price', 'ts'):
+            old = getattr(self, column)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+
+    def append(self, items, ts_ms):
+        """Record every line item of one order"""
+        with self.lock:
+            if self.size + len(items) > len(self.ts):
+                self._grow(self.size + len(items))
+            for item in items:
+                sku = str(item.get('id'))
+                category = item.get('category') or catalog.category_of(sku) or 'Uncategorized'
+                i = self.size
+                self.sku[i] = self._encode(self.sku_codes, self.sku_keys, sku)
+                self.category[i] = self._encode(self.category_codes, self.category_keys, category)
+                self.quantity[i] = item.get('quantity', 1)
+                self.price[i] = item.get('price', 0)
+                self.ts[i] = ts_ms
+                self.size += 1
+
+    def snapshot(self):
+        """Consistent read-only views of the filled part of every column"""
+        with self.lock:
+            n = self.size
+            return {
+                'sku': self.sku[:n], 'category': self.category[:n], 'quantity': self.quantity[:n],
+                'price': self.price[:n], 'ts': self.ts[:n],
+                'sku_keys': list(self.sku_keys), 'category_keys': list(self.category_keys)
+            }
+
+    def aggregate(self, group_by, window_ms, since_ms, until_ms, rolling=1):
+        """Revenue, quantity and line-item counts per group per time bucket.
+
+        Only groups with sales in the range get a row. Raises ValueError when groups x buckets
+        exceeds MAX_CELLS.
+        """
+        cols = self.snapshot()
+        codes, keys = (cols['category'], cols['category_keys']) if group_by == 'category' \
+            else (cols['sku'], cols['sku_keys'])
+        n_buckets = (until_ms - since_ms) // window_ms + 1
+
+        mask = (cols['ts'] >= since_ms) & (cols['ts'] <= until_ms)
+        # Re-code to the groups present in the range, so the matrices do not scale with every SKU ever sold
+        present, group = np.unique(codes[mask], return_inverse=True)
+        keys = [keys[code] for code in present]
+        n_groups = max(len(keys), 1)
+        if n_groups * n_buckets > self.MAX_CELLS:
+            raise ValueError(f'{n_groups} groups x {n_buckets} windows is more than {self.MAX_CELLS} cells')
+        bucket = (cols['ts'][mask] - since_ms) // window_ms
+        cell = group.astype(np.int64) * n_buckets + bucket
+        quantity = cols['quantity'][mask]
+        shape = (n_groups, n_buckets)
+        revenue = np.bincount(cell, weights=quantity * cols['price'][mask], minlength=n_groups * n_buckets).reshape(shape)
+        units = np.bincount(cell, weights=quantity, minlength=n_groups * n_buckets).reshape(shape)
+        lines = np.bincount(cell, minlength=n_groups * n_buckets).reshape(shape)
+
+        if rolling > 1:
+            # Trailing sum over the last `rolling` buckets via prefix sums
+            def roll(matrix):
+                csum = np.cumsum(matrix, axis=1)
+                csum[:, rolling:] = csum[:, rolling:] - csum[:, :-rolling]
+                return csum
+            revenue, units, lines = roll(revenue), roll(units), roll(lines)
+
+        return keys, revenue, units, lines
+
+sales_facts = SalesFactStore()
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def parse_order_items(items):
+    """Validate order line items so they fit the fact columns; raises ValueError with a reason"""
+    if not isinstance(items, list):
+        raise ValueError('items must be a list')
+    parsed = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError('each item must be an object')
+        quantity, price = item.get('quantity', 1), item.get('price', 0)
+        if not (is_number(quantity) and 1 <= quantity <= INT32_MAX and float(quantity).is_integer()):
+            raise ValueError(f'item quantity must be an integer between 1 and {INT32_MAX}')
+        if not (is_number(price) and math.isfinite(price) and price >= 0):
+            raise ValueError('item price must be a non-negative number')
+        category = item.get('category')
+        if category is not None and not isinstance(category, str):
+            raise ValueError('item category must be a string')
+        parsed.append({**item, 'quantity': int(quantity), 'price': float(price)})
+    return parsed
+
+WINDOW_UNITS_MS = {'s': 1000, 'm': 60 * 1000, 'h': 60 * 60 * 1000, 'd': 24 * 60 * 60 * 1000}
+
+def parse_window(value):
+    """Parse a window like '30s', '15m', '1h' or '1d' into milliseconds"""
+    window_ms = int(value[:-1]) * WINDOW_UNITS_MS[value[-1]]
+    if window_ms <= 0:
+        raise ValueError(value)
+    return window_ms
+
+# ==================== Idempotency ====================
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', str(24 * 60 * 60)))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv('IDEMPOTENCY_MAX_KEYS', '10000'))
+# A duplicate waits this long for the original; keep it under the BFF's 5s upstream timeout so it gets a 409, not a timeout
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', '4'))
+
+class IdempotencyEntry:
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.response = None  # (body, status, mimetype) once the original finished
+        self.expires_at = time.time() + IDEMPOTENCY_TTL_SECONDS
+
+class IdempotencyCache:
+    """Bounded, TTL-evicted map of Idempotency-Key -> stored response"""
+
+    def __init__(self, max_keys, ttl_seconds):
+        self.max_keys = max_keys
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # insertion order == expiry order
+        self.lock = threading.Lock()
+
+    def claim(self, key, fingerprint):
+        """Return (entry, is_owner); the owner executes the request, everyone else waits on it"""
+        now = time.time()
+        with self.lock:
+            while self.entries:
+                oldest_key, oldest = next(iter(self.entries.items()))
+                if oldest.expires_at > now and len(self.entries) < self.max_keys:
+                    break
+                del self.entries[oldest_key]
+            entry = self.entries.get(key)
+            if entry is not None:
+                return entry, False
+            entry = self.entries[key] = IdempotencyEntry(fingerprint)
+            return entry, True
+
+    def release(self, key, entry):
+        """Forget a claim whose request failed so the client can retry"""
+        with self.lock:
+            if self.entries.get(key) is entry:
+                del self.entries[key]
+        entry.done.set()
+
+idempotency_cache = IdempotencyCache(IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_TTL_SECONDS)
+
+def idempotent(f):
+    """Replay the stored response for a repeated Idempotency-Key instead of re-executing"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return f(*args, **kwargs)
+
+        key = f'{request.path}:{key}'
+        fingerprint = hashlib.sha1(request.get_data()).hexdigest()
+        entry, is_owner = idempotency_cache.claim(key, fingerprint)
+        if not is_owner:
+            if entry.fingerprint != fingerprint:
+                return jsonify({'error': 'Idempotency-Key reused with a different request body'}), 422
+            if not entry.done.is_set():
+                idempotency_collisions.inc()
+                entry.done.wait(IDEMPOTENCY_WAIT_SECONDS)
+            if entry.response is None:
+                return jsonify({'error': 'Original request is still in progress or failed, retry later'}), 409
+            idempotency_replays.inc()
+            body, status, mimetype = entry.response
+            return Response(body, status, {'Idempotent-Replayed': 'true'}, mimetype=mimetype)
+
+        try:
+            response = app.make_response(f(*args, **kwargs))
+        except Exception:
+            idempotency_cache.release(key, entry)
+            raise
+        if response.status_code >= 500:
+            idempotency_cache.release(key, entry)
+            return response
+        entry.response = (response.get_data(), response.status_code, response.mimetype)
+        entry.done.set()
+        return response
+
+    return decorated
+
+# ==================== Bulk Import ====================
+
+BULK_BATCH_SIZE = 1000
+BULK_MAX_ERRORS = 100
+
+def read_bulk_rows(stream, content_type):
+    """Yield (line number, row dict or error message) from an NDJSON or CSV body, line by line"""
+    undecodable = []  # lines that were not valid UTF-8 since the last row was yielded
+
+    def decode():
+        for line_no, line in enumerate(stream, start=1):
+            try:
+                yield line.decode('utf-8')
+            except UnicodeDecodeError:
+                undecodable.append(line_no)
+                yield line.decode('utf-8', 'replace')
+
+    lines = decode()
+    if 'csv' in content_type:
+        reader = csv.DictReader(lines)
+        for row in reader:
+            if undecodable:
+                undecodable.clear()
+                yield reader.line_num, 'invalid UTF-8'
+                continue
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(lines, start=1):
+        if undecodable:
+            undecodable.clear()
+            yield line_no, 'invalid UTF-8'
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, 'invalid JSON'
+            continue
+        yield line_no, row if isinstance(row, dict) else 'expected a JSON object'
+
+def validate_bulk_row(row):
+    """Turn a raw row into a catalog record, raising ValueError with a reason"""
+    name, category = row.get('name'), row.get('category')
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError('name is required and must be a string')
+    if category is not None and not isinstance(category, str):
+        raise ValueError('category must be a string')
+    try:
+        price = float(row.get('price'))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError('price must be a number')
+    if not (math.isfinite(price) and price >= 0):
+        raise ValueError('price must be a finite, non-negative number')
+    stock = row.get('stock')
+    if stock not in (None, ''):
+        try:
+            stock = int(stock)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError('stock must be an integer')
+        if not 0 <= stock <= INT32_MAX:
+            raise ValueError(f'stock must be between 0 and {INT32_MAX}')
+    else:
+        stock = None
+    product_id = str(row.get('id') or '').strip() or str(id_generator.next_id())
+    return product_id, name.strip(), price, category or None, stock
+
+# ==================== Request Tracing ====================
+
+tracer = init_tracing(app, 'core-service', caller_is_admin)
+
 @app.before_request
 def before_request():
     request.start_time = time.time()
+    start_trace()
 
 @app.after_request
 def after_request(response):
     if hasattr(request, 'start_time'):
         duration = time.time() - request.start_time
-        request_duration.labels(method=request.method, endpoint=request.path).observe(duration)
+        request_duration.labels(method=request.method, endpoint=request.path).observe(duration, exemplar={'trace_id': g.trace_id})
+        finish_trace(response, duration)
     request_count.labels(method=request.method, endpoint=request.path).inc()
     return response
 
+# ==================== Response Compression ====================
+
+init_compression(app, 'core')
+
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy', 'service': 'core-service', 'timestamp': datetime.now().isoformat()}), 200
 
 @app.route('/metrics', methods=['GET'])
 def metrics():
-    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+    return metrics_response()
 
 @app.route('/products', methods=['GET'])
 def get_products():
-    """Get all products"""
+    """Get all products, or only those listed in `ids` (comma separated)"""
     products_queried.inc()
-    return jsonify(list(products_db.values())), 200
+    if 'ids' in request.args:
+        return lookup_products([i for i in request.args['ids'].split(',') if i])
+    return catalog_response('products')
+
+MAX_LOOKUP_IDS = 500
+
+def lookup_products(product_ids):
+    """Resolve many product IDs in one response, listing the ones that do not exist"""
+    if len(product_ids) > MAX_LOOKUP_IDS:
+        return jsonify({'error': f'At most {MAX_LOOKUP_IDS} ids per request'}), 400
+    products, missing = [], []
+    for product_id in dict.fromkeys(product_ids):
+        product = catalog.get(product_id)
+        if product is None:
+            missing.append(product_id)
+        else:
+            products.append(product)
+    return jsonify({'products': products, 'missing': missing}), 200
 
 @app.route('/products/<product_id>', methods=['GET'])
 def get_product(product_id):
     """Get specific product"""
     products_queried.inc()
-    if product_id in products_db:
-        return jsonify(products_db[product_id]), 200
+    product = catalog.get(product_id)
+    if product is not None:
+        return jsonify(product), 200
     return jsonify({'error': 'Product not found'}), 404
 
 @app.route('/products', methods=['POST'])
 def create_product():
     """Create new product"""
     data = request.get_json()
-    product_id = str(uuid.uuid4())[:8]
-    products_db[product_id] = {
-        'id': product_id,
-        'name': data.get('name'),
-        'price': data.get('price'),
-        'category': data.get('category')
-    }
-    return jsonify(products_db[product_id]), 201
+    product_id = str(id_generator.next_id())
+    try:
+        product = catalog.add(product_id, data.get('name'), data.get('price'), data.get('category'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'price must be a number'}), 400
+    bump_catalog_version()
+    return jsonify(product), 201
+
+@app.route('/products/bulk', methods=['POST'])
+def bulk_import_products():
+    """Upsert products from a streamed NDJSON (default) or CSV (Content-Type: text/csv) body"""
+    start = time.time()
+    inserted = updated = rejected = 0
+    errors = []
+    batch = []
+
+    def flush():
+        nonlocal inserted, updated
+        added, changed = catalog.upsert_many(batch)
+        inserted += added
+        updated += changed
+        batch.clear()
+        bump_catalog_version()
+
+    for line_no, row in read_bulk_rows(request.stream, request.content_type or ''):
+        try:
+            if isinstance(row, str):
+                raise ValueError(row)
+            batch.append(validate_bulk_row(row))
+        except ValueError as e:
+            rejected += 1
+            if len(errors) < BULK_MAX_ERRORS:
+                errors.append({'line': line_no, 'error': str(e)})
+            continue
+        if len(batch) >= BULK_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+
+    duration = time.time() - start
+    accepted = inserted + updated
+    rows_per_sec = (accepted + rejected) / duration if duration > 0 else 0.0
+    bulk_rows.labels(operation='import', result='accepted').inc(accepted)
+    bulk_rows.labels(operation='import', result='rejected').inc(rejected)
+    bulk_throughput.labels(operation='import').set(rows_per_sec)
+    return jsonify({
+        'inserted': inserted,
+        'updated': updated,
+        'rejected': rejected,
+        'errors': errors,
+        'duration_seconds': round(duration, 3),
+        'rows_per_sec': round(rows_per_sec, 1)
+    }), 200
+
+@app.route('/products/export', methods=['GET'])
+def export_products():
+    """Stream the whole catalog as NDJSON"""
+    def stream():
+        start = time.time()
+        rows = 0
+        for chunk in catalog.export_ndjson():
+            rows += chunk.count('\n')
+            yield chunk
+        duration = time.time() - start
+        bulk_rows.labels(operation='export', result='accepted').inc(rows)
+        if duration > 0:
+            bulk_throughput.labels(operation='export').set(rows / duration)
+
+    return Response(stream(), mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': 'attachment; filename=products.ndjson'})
 
 @app.route('/orders', methods=['POST'])
+@idempotent
 def create_order():
     """Create new order"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    try:
+        items = parse_order_items(data.get('items', []))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     orders_created.inc()
-    data = request.get_json()
-    order_id = str(uuid.uuid4())[:8]
+    raw_id = id_generator.next_id()
+    order_id = str(raw_id)
     
     order = {
         'id': order_id,
-        'items': data.get('items', []),
-        'total': sum(item.get('price', 0) * item.get('quantity', 1) for item in data.get('items', [])),
+        'items': items,
+        'total': sum(item['price'] * item['quantity'] for item in items),
         'status': 'created',
-        'created_at': datetime.now().isoformat()
+        'customer_email': data.get('customer_email'),
+        'created_at': datetime.fromtimestamp(SnowflakeGenerator.timestamp_ms(raw_id) / 1000).isoformat()
     }
+    # Facts first: the order only becomes visible once everything derived from it is recorded
+    sales_facts.append(items, SnowflakeGenerator.timestamp_ms(raw_id))
     orders_db[order_id] = order
+    index_order(raw_id, order['customer_email'])
+    order_events.publish('order_created', order)
     return jsonify(order), 201
 
+@app.route('/orders/events', methods=['GET'])
+def order_event_stream():
+    """Server-sent events for order creation and status changes (resumable via Last-Event-ID).
+
+    ?customer_email= limits the stream to that customer's orders.
+    """
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id', ''))
+    except ValueError:
+        last_event_id = None
+    customer_email = request.args.get('customer_email')
+    subscriber, backlog = order_events.subscribe(last_event_id)
+
+    def stream():
+        try:
+            # Flush headers immediately and set the browser's reconnect delay
+            yield 'retry: 3000\n\n'
+            for event in backlog:
+                if customer_email is None or event[3] == customer_email:
+                    yield format_sse(event)
+            while True:
+                try:
+                    event = subscriber.get(timeout=15)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if event is None:
+                    break
+                if customer_email is None or event[3] == customer_email:
+                    yield format_sse(event)
+        finally:
+            order_events.unsubscribe(subscriber)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/orders', methods=['GET'])
+def list_orders():
+    """List orders newest first. Query params: since, until, status, customer_email, limit, cursor"""
+    try:
+        since = request.args.get('since')
+        until = request.args.get('until')
+        cursor = request.args.get('cursor')
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+        # IDs embed their creation time, so time bounds become ID bounds
+        lo = SnowflakeGenerator.lower_bound(parse_time_param(since)) if since else 0
+        hi = SnowflakeGenerator.lower_bound(parse_time_param(until) + 1) if until else None
+        if cursor:
+            hi = int(cursor) if hi is None else min(hi, int(cursor))
+    except ValueError:
+        return jsonify({'error': 'Invalid since/until/limit/cursor parameter'}), 400
+
+    status = request.args.get('status')
+    customer_email = request.args.get('customer_email')
+    with order_index_lock:
+        index = customer_order_index.get(normalize_email(customer_email), []) if customer_email else order_index
+        start = bisect.bisect_left(index, lo)
+        end = len(index) if hi is None else bisect.bisect_left(index, hi)
+        orders = []
+        pos = end - 1
+        while pos >= start and len(orders) < limit:
+            order = orders_db[str(index[pos])]
+            if not status or order['status'] == status:
+                orders.append(order)
+            pos -= 1
+        more = pos >= start
+
+    return jsonify({
+        'orders': orders,
+        'count': len(orders),
+        'next_cursor': orders[-1]['id'] if orders and more else None
+    }), 200
+
+# Bucket starts are rendered with datetime, which stops at year 9999
+ANALYTICS_MAX_TIME_MS = int(datetime(9999, 12, 30).timestamp() * 1000)
+
+@app.route('/analytics/sales', methods=['GET'])
+def sales_analytics():
+    """Sales per group per time window. Query params: group_by, window, since, until, rolling"""
+    group_by = request.args.get('group_by', 'category')
+    if group_by not in ('category', 'sku'):
+        return jsonify({'error': 'group_by must be category or sku'}), 400
+    window = request.args.get('window', '1h')
+    try:
+        window_ms = parse_window(window)
+        until_ms = parse_time_param(request.args['until']) if 'until' in request.args else int(time.time() * 1000)
+        since_ms = parse_time_param(request.args['since']) if 'since' in request.args else until_ms - 24 * window_ms
+        rolling = max(int(request.args.get('rolling', 1)), 1)
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Invalid window/since/until/rolling parameter'}), 400
+    if not (0 <= since_ms and until_ms <= ANALYTICS_MAX_TIME_MS):
+        return jsonify({'error': 'since and until must fall between 1970 and 9999'}), 400
+    # Align buckets to window boundaries so repeated queries line up
+    since_ms -= since_ms % window_ms
+    if until_ms < since_ms or (until_ms - since_ms) // window_ms >= 10000:
+        return jsonify({'error': 'Time range must cover between 1 and 10000 windows'}), 400
+
+    start = time.time()
+    try:
+        keys, revenue, units, lines = sales_facts.aggregate(group_by, window_ms, since_ms, until_ms, rolling)
+    except ValueError as e:
+        return jsonify({'error': f'Too many series to return ({e}); narrow the range or widen the window'}), 400
+    active = np.flatnonzero(lines.any(axis=1)) if keys else []
+    bucket_starts = [datetime.fromtimestamp((since_ms + b * window_ms) / 1000).isoformat()
+                     for b in range(revenue.shape[1])]
+    series = [{
+        'key': keys[g],
+        'revenue': np.round(revenue[g], 2).tolist(),
+        'quantity': units[g].astype(np.int64).tolist(),
+        'line_items': lines[g].tolist()
+    } for g in active]
+    analytics_query_duration.labels(group_by=group_by).observe(time.time() - start)
+
+    return jsonify({
+        'group_by': group_by,
+        'window': window,
+        'rolling': rolling,
+        'buckets': bucket_starts,
+        'series': series
+    }), 200
+
 @app.route('/orders/<order_id>', methods=['GET'])
 def get_order(order_id):
     """Get order details"""
@@ -101,17 +942,24 @@ def get_order(order_id):
 @app.route('/inventory', methods=['GET'])
 def get_inventory():
     """Get inventory information"""
-    inventory = []
-    for product_id, product in products_db.items():
-        inventory.append({
-            'id': product_id,
-            'name': product['name'],
-            'category': product['category'],
-            'price': product['price'],
-            'stock': 100,  # Mock stock value
-            'reorderLevel': 20
-        })
-    return jsonify(inventory), 200
+    return catalog_response('inventory')
+
+@app.route('/inventory/<product_id>', methods=['PUT'])
+def update_stock(product_id):
+    """Set the stock level for a product"""
+    if product_id not in catalog:
+        return jsonify({'error': 'Product not found'}), 404
+
+    data = request.get_json(silent=True)
+    try:
+        stock = int(data.get('stock'))
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({'error': 'stock must be an integer'}), 400
+    if not 0 <= stock <= INT32_MAX:
+        return jsonify({'error': f'stock must be between 0 and {INT32_MAX}'}), 400
+    catalog.set_stock(product_id, stock)
+    bump_catalog_version()
+    return jsonify({'id': product_id, 'stock': stock}), 200
 
 @app.route('/orders/<order_id>/status', methods=['PUT'])
 def update_order_status(order_id):
@@ -120,8 +968,19 @@ def update_order_status(order_id):
         return jsonify({'error': 'Order not found'}), 404
     
     data = request.get_json()
+    previous = orders_db[order_id]['status']
     orders_db[order_id]['status'] = data.get('status')
+    order_events.publish('order_status_changed', {
+        'id': order_id,
+        'status': orders_db[order_id]['status'],
+        'previous_status': previous,
+        'customer_email': orders_db[order_id].get('customer_email')
+    })
     return jsonify(orders_db[order_id]), 200
 
+# ==================== Sampling Profiler ====================
+
+init_profiling(app, tracer.service_name, caller_is_admin)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=False)
@@ -2,12 +2,25 @@
 Customer Management Service
 Handles customer profiles, preferences, and related operations
 """
-from flask import Flask, jsonify, request
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from flask import Flask, jsonify, request, Response, g
+from prometheus_client import Counter, Gauge, Histogram
+from common.admin import caller_is_admin
+from common.compression import init_compression
+from common.profiling import init_profiling
+from common.tracing import TracedSession, init_tracing, start_trace, finish_trace, metrics_response
 from datetime import datetime
 import time
 import os
+import atexit
+import bisect
+import json
+import math
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
 from functools import wraps
+import numpy as np
 import requests
 
 app = Flask(__name__)
@@ -16,47 +29,786 @@ app = Flask(__name__)
 request_count = Counter('customer_mgmt_requests_total', 'Total requests', ['method', 'endpoint'])
 request_duration = Histogram('customer_mgmt_request_duration_seconds', 'Request duration', ['method', 'endpoint'])
 customer_operations = Counter('customer_operations_total', 'Customer operations', ['operation'])
+write_queue_depth = Gauge('customer_mgmt_write_queue_depth', 'Records waiting in the write-behind queue')
+write_coalesced = Counter('customer_mgmt_write_coalesced_total', 'Writes merged into an already queued record')
+flush_duration = Histogram('customer_mgmt_flush_duration_seconds', 'Time to write one write-behind batch to SQLite')
+flush_lag = Histogram('customer_mgmt_flush_lag_seconds', 'Age of the oldest queued write when its batch was flushed')
+flush_errors = Counter('customer_mgmt_flush_errors_total', 'Write-behind batches that failed and were re-queued')
+loyalty_events = Counter('customer_mgmt_loyalty_order_events_total', 'Order events seen by the loyalty engine', ['result'])
+loyalty_tier_customers = Gauge('customer_mgmt_loyalty_tier_customers', 'Customers per loyalty tier', ['tier'])
+loyalty_recompute_duration = Histogram('customer_mgmt_loyalty_recompute_duration_seconds', 'Batch loyalty recompute duration')
+rfm_run_duration = Histogram('customer_mgmt_rfm_run_duration_seconds', 'RFM segmentation run duration', ['mode'],
+                            buckets=(.01, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60))
+rfm_customers_scored = Counter('customer_mgmt_rfm_customers_scored_total', 'Customers scored by RFM segmentation', ['mode'])
+rfm_segment_customers = Gauge('customer_mgmt_rfm_segment_customers', 'Customers per RFM segment', ['segment'])
+order_history_cache_lookups = Counter('customer_mgmt_order_history_cache_total', 'Order history cache lookups', ['result'])
 
 # Configuration
 AUTH_SERVICE_URL = os.getenv('AUTH_SERVICE_URL', 'http://auth-service:5003')
+CORE_SERVICE_URL = os.getenv('CORE_SERVICE_URL', 'http://core-service:5001')
+DB_PATH = Path(os.getenv('CUSTOMER_DB_PATH', str(Path(__file__).resolve().parent / 'data' / 'customers.db')))
+WRITE_BEHIND_INTERVAL = float(os.getenv('WRITE_BEHIND_INTERVAL_SECONDS', '0.5'))
+WRITE_BEHIND_MAX_BATCH = 500
+ORDER_HISTORY_TTL = float(os.getenv('ORDER_HISTORY_TTL_SECONDS', '10'))
+ORDER_HISTORY_MAX_CUSTOMERS = 10000
+RFM_JOB_INTERVAL = float(os.getenv('RFM_JOB_INTERVAL_SECONDS', '3600'))  # 0 disables the background job
 
-# In-memory customer database
-customers_db = {
-    '1': {
-        'id': '1',
-        'email': 'customer@supermarket.com',
-        'name': 'Customer User',
-        'phone': '555-0001',
-        'address': '123 Main St',
-        'city': 'Anytown',
-        'state': 'ST',
-        'zip': '12345',
-        'country': 'USA',
-        'membership_level': 'silver',
-        'total_orders': 5,
-        'total_spent': 250.00,
-        'created_at': datetime.now().isoformat(),
-        'updated_at': datetime.now().isoformat()
-    }
+# ==================== Persistence ====================
+
+class CustomerDatabase:
+    """SQLite backing store in WAL mode; each row holds the JSON document of one record"""
+
+    def __init__(self, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS customers (id TEXT PRIMARY KEY, email TEXT NOT NULL, doc TEXT NOT NULL)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS preferences (email TEXT PRIMARY KEY, doc TEXT NOT NULL)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, doc TEXT NOT NULL)')
+        self.conn.commit()
+
+    def load(self):
+        customers = [json.loads(doc) for (doc,) in self.conn.execute('SELECT doc FROM customers')]
+        preferences = {email: json.loads(doc) for email, doc in self.conn.execute('SELECT email, doc FROM preferences')}
+        state = {name: json.loads(doc) for name, doc in self.conn.execute('SELECT name, doc FROM state')}
+        return customers, preferences, state
+
+    def write_batch(self, customers, preferences, state):
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO customers (id, email, doc) VALUES (?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET email=excluded.email, doc=excluded.doc', customers)
+            self.conn.executemany(
+                'INSERT INTO preferences (email, doc) VALUES (?, ?) '
+                'ON CONFLICT(email) DO UPDATE SET doc=excluded.doc', preferences)
+            self.conn.executemany(
+                'INSERT INTO state (name, doc) VALUES (?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET doc=excluded.doc', state)
+
+class WriteBehindQueue:
+    """Coalescing write-behind queue: only the latest version of each record is written"""
+
+    def __init__(self, db, interval):
+        self.db = db
+        self.interval = interval
+        self.pending = {}  # (table, key) -> latest document
+        self.oldest = None
+        self.cond = threading.Condition()
+        self.flush_lock = threading.Lock()
+        threading.Thread(target=self.run, name='write-behind', daemon=True).start()
+
+    def put(self, table, key, doc):
+        with self.cond:
+            if (table, key) in self.pending:
+                write_coalesced.inc()
+            elif not self.pending:
+                self.oldest = time.time()
+            self.pending[(table, key)] = doc
+            write_queue_depth.set(len(self.pending))
+            if len(self.pending) >= WRITE_BEHIND_MAX_BATCH:
+                self.cond.notify()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.cond:
+                batch, oldest = self.pending, self.oldest
+                self.pending, self.oldest = {}, None
+                write_queue_depth.set(0)
+            if not batch:
+                return
+            start = time.time()
+            customers = [(key, doc['email'], json.dumps(doc)) for (table, key), doc in batch.items() if table == 'customers']
+            preferences = [(key, json.dumps(doc)) for (table, key), doc in batch.items() if table == 'preferences']
+            state = [(key, json.dumps(doc)) for (table, key), doc in batch.items() if table == 'state']
+            try:
+                self.db.write_batch(customers, preferences, state)
+            except Exception as e:
+                print(f"Write-behind flush error: {e}")
+                flush_errors.inc()
+                with self.cond:
+                    # Newer writes queued meanwhile win over the failed batch
+                    for key, doc in batch.items():
+                        self.pending.setdefault(key, doc)
+                    self.oldest = oldest
+                    write_queue_depth.set(len(self.pending))
+                return
+            flush_duration.observe(time.time() - start)
+            flush_lag.observe(time.time() - oldest)
+
+    def run(self):
+        while True:
+            with self.cond:
+                self.cond.wait(self.interval)
+            self.flush()
+
+# ==================== Loyalty Rules ====================
+
+# Points are floor(total_spent * points_per_dollar); the tier is the highest threshold reached
+loyalty_rules = {
+    'points_per_dollar': 1.0,
+    'tiers': [('bronze', 0), ('silver', 200), ('gold', 1000), ('platinum', 5000)]
+}
+
+TIER_BENEFITS = {
+    'bronze': ['Member-only deals'],
+    'silver': ['5% discount on all purchases', 'Free shipping on orders over $50', 'Exclusive member-only deals'],
+    'gold': ['10% discount on all purchases', 'Free shipping on all orders', 'Exclusive member-only deals'],
+    'platinum': ['15% discount on all purchases', 'Free express shipping', 'Priority support', 'Exclusive member-only deals']
+}
+
+def loyalty_points(total_spent, rules=None):
+    rules = rules or loyalty_rules
+    return int(total_spent * rules['points_per_dollar'])
+
+def loyalty_tier(points, rules=None):
+    rules = rules or loyalty_rules
+    tier = rules['tiers'][0][0]
+    for name, threshold in rules['tiers']:
+        if points >= threshold:
+            tier = name
+    return tier
+
+# ==================== Customer Store ====================
+
+PROFILE_FIELDS = ('name', 'phone', 'address', 'city', 'state', 'zip', 'country')
+RFM_INPUT_FIELDS = frozenset(('total_orders', 'total_spent', 'last_order_id'))
+DEFAULT_PREFERENCES = {
+    'notifications_email': True,
+    'notifications_sms': False,
+    'newsletter': True,
+    'language': 'en',
+    'currency': 'USD'
 }
 
+class CustomerStore:
+    """In-memory customers keyed by ID with a unique email index and an atomic ID allocator.
+
+    Secondary indexes (membership level, city, sorted ID and sorted total_spent)
+    are maintained on every write so admin listings never scan all customers.
+    """
+
+    def __init__(self, writer=None):
+        self.customers = {}
+        self.email_index = {}  # normalized email -> customer id
+        self.preferences = {}  # normalized email -> preferences
+        self.state = {}  # name -> small bookkeeping document, e.g. the order event position
+        self.by_membership = {}  # membership level -> set of customer ids
+        self.by_city = {}  # normalized city -> set of customer ids
+        self.id_order = []  # sorted int(customer id)
+        self.spent_order = []  # sorted (total_spent, int(customer id))
+        self.next_id = 1
+        self.rfm_dirty = set()  # customer ids whose order aggregates changed since the last RFM run
+        self.lock = threading.RLock()
+        self.writer = writer
+
+    @staticmethod
+    def normalize(value):
+        return (value or '').strip().lower()
+
+    def _index_membership(self, customer):
+        self.by_membership.setdefault(self.normalize(customer['membership_level']), set()).add(customer['id'])
+
+    def _index_city(self, customer):
+        self.by_city.setdefault(self.normalize(customer['city']), set()).add(customer['id'])
+
+    def _index_spent(self, customer):
+        bisect.insort(self.spent_order, (customer['total_spent'], int(customer['id'])))
+
+    def _index(self, customer):
+        self._index_membership(customer)
+        self._index_city(customer)
+        self._index_spent(customer)
+
+    def _update(self, customer, changes):
+        """Apply field changes to a stored customer, re-indexing only the indexed fields that changed"""
+        customer_id = customer['id']
+        if 'membership_level' in changes and changes['membership_level'] != customer['membership_level']:
+            self.by_membership.get(self.normalize(customer['membership_level']), set()).discard(customer_id)
+            customer['membership_level'] = changes['membership_level']
+            self._index_membership(customer)
+        if 'city' in changes and changes['city'] != customer['city']:
+            self.by_city.get(self.normalize(customer['city']), set()).discard(customer_id)
+            customer['city'] = changes['city']
+            self._index_city(customer)
+        if 'total_spent' in changes and changes['total_spent'] != customer['total_spent']:
+            key = (customer['total_spent'], int(customer_id))
+            pos = bisect.bisect_left(self.spent_order, key)
+            if pos < len(self.spent_order) and self.spent_order[pos] == key:
+                del self.spent_order[pos]
+            customer['total_spent'] = changes['total_spent']
+            self._index_spent(customer)
+        if not RFM_INPUT_FIELDS.isdisjoint(changes):
+            self.rfm_dirty.add(customer_id)
+        customer.update(changes)
+
+    def _persist(self, table, key, doc):
+        if self.writer:
+            self.writer.put(table, key, dict(doc))
+
+    @staticmethod
+    def normalize_email(email):
+        return (email or '').strip().lower()
+
+    def __len__(self):
+        return len(self.customers)
+
+    def allocate_id(self):
+        with self.lock:
+            customer_id = str(self.next_id)
+            self.next_id += 1
+            return customer_id
+
+    def add(self, customer, persist=True):
+        """Insert a full customer record, enforcing email uniqueness"""
+        email = self.normalize_email(customer['email'])
+        with self.lock:
+            if email in self.email_index:
+                raise ValueError(f"Customer with email {customer['email']} already exists")
+            customer = dict(customer)
+            if not customer.get('id'):
+                customer['id'] = self.allocate_id()
+            elif customer['id'].isdigit():
+                self.next_id = max(self.next_id, int(customer['id']) + 1)
+            self.customers[customer['id']] = customer
+            self.email_index[email] = customer['id']
+            bisect.insort(self.id_order, int(customer['id']))
+            self._index(customer)
+            self.rfm_dirty.add(customer['id'])
+            if persist:
+                self._persist('customers', customer['id'], customer)
+            return dict(customer)
+
+    def get(self, customer_id):
+        customer = self.customers.get(customer_id)
+        return dict(customer) if customer else None
+
+    def get_by_email(self, email):
+        customer_id = self.email_index.get(self.normalize_email(email))
+        return self.get(customer_id) if customer_id else None
+
+    def upsert_profile(self, email, name, data):
+        """Update the profile owned by `email`, creating it on first write"""
+        now = datetime.now().isoformat()
+        with self.lock:
+            customer_id = self.email_index.get(self.normalize_email(email))
+            if customer_id is None:
+                return self.add({
+                    'id': None,
+                    'email': email,
+                    'name': name or 'Customer',
+                    'phone': data.get('phone', ''),
+                    'address': data.get('address', ''),
+                    'city': data.get('city', ''),
+                    'state': data.get('state', ''),
+                    'zip': data.get('zip', ''),
+                    'country': data.get('country', 'USA'),
+                    'membership_level': 'bronze',
+                    'total_orders': 0,
+                    'total_spent': 0.0,
+                    'loyalty_points': 0,
+                    'created_at': now,
+                    'updated_at': now
+                })
+            customer = self.customers[customer_id]
+            changes = {field: data[field] for field in PROFILE_FIELDS if field in data}
+            changes['updated_at'] = now
+            self._update(customer, changes)
+            self._persist('customers', customer_id, customer)
+            return dict(customer)
+
+    def save_state(self, name, doc):
+        with self.lock:
+            self.state[name] = dict(doc)
+            self._persist('state', name, doc)
+
+    def get_preferences(self, email):
+        prefs = dict(DEFAULT_PREFERENCES)
+        prefs.update(self.preferences.get(self.normalize_email(email), {}))
+        return prefs
+
+    def update_preferences(self, email, data):
+        key = self.normalize_email(email)
+        with self.lock:
+            prefs = self.preferences.setdefault(key, {})
+            prefs.update({k: v for k, v in data.items() if k in DEFAULT_PREFERENCES})
+            self._persist('preferences', key, prefs)
+        return self.get_preferences(email)
+
+    def apply_order(self, email, order_id, total):
+        """Fold one new order into spend, points and tier in O(1); returns the result label"""
+        try:
+            order_seq = int(order_id)
+        except (TypeError, ValueError):
+            order_seq = None
+        with self.lock:
+            customer_id = self.email_index.get(self.normalize_email(email))
+            if customer_id is None:
+                return 'unknown_customer'
+            customer = self.customers[customer_id]
+            # Order IDs are time-ordered, so anything not newer than the last applied one is a replay
+            if order_seq is not None and order_seq <= customer.get('last_order_id', 0):
+                return 'duplicate'
+            total_spent = round(customer['total_spent'] + float(total or 0), 2)
+            points = loyalty_points(total_spent)
+            changes = {
+                'total_orders': customer['total_orders'] + 1,
+                'total_spent': total_spent,
+                'loyalty_points': points,
+                'membership_level': loyalty_tier(points),
+                'updated_at': datetime.now().isoformat()
+            }
+            if order_seq is not None:
+                changes['last_order_id'] = order_seq
+            self._update(customer, changes)
+            self._persist('customers', customer_id, customer)
+        return 'applied'
+
+    def recompute_loyalty(self, rules):
+        """Re-derive points and tiers for every customer with vectorized NumPy; returns (scanned, changed)"""
+        tier_names = [name for name, _ in rules['tiers']]
+        thresholds = np.array([threshold for _, threshold in rules['tiers']], dtype=np.int64)
+        tier_codes = {name: code for code, name in enumerate(tier_names)}
+        with self.lock:
+            ids = list(self.customers)
+            records = [self.customers[customer_id] for customer_id in ids]
+            spent = np.fromiter((c['total_spent'] for c in records), dtype=np.float64, count=len(ids))
+            old_points = np.fromiter((c.get('loyalty_points', 0) for c in records), dtype=np.int64, count=len(ids))
+            old_tiers = np.fromiter((tier_codes.get(c['membership_level'], -1) for c in records), dtype=np.int64, count=len(ids))
+
+        # Orders keep being applied while the new values are computed
+        points = np.floor(spent * rules['points_per_dollar']).astype(np.int64)
+        tiers = np.searchsorted(thresholds, points, side='right') - 1
+        changed = np.flatnonzero((points != old_points) | (tiers != old_tiers))
+
+        written = 0
+        with self.lock:
+            for i in changed:
+                customer = records[i]
+                if customer['total_spent'] != spent[i]:
+                    continue  # an order landed meanwhile and apply_order already used the new rules
+                self._update(customer, {'loyalty_points': int(points[i]), 'membership_level': tier_names[tiers[i]]})
+                self._persist('customers', customer['id'], customer)
+                written += 1
+        return len(ids), written
+
+    def values(self):
+        with self.lock:
+            return [dict(customer) for customer in self.customers.values()]
+
+    def _plan(self, membership_level, city, sort):
+        """Pick the sorted keys to walk: a small filtered set sorted directly, or the full index"""
+        by_spent = sort.lstrip('-') == 'total_spent'
+        candidates = None
+        for index, value in ((self.by_membership, membership_level), (self.by_city, city)):
+            if value is not None:
+                ids = index.get(self.normalize(value), set())
+                candidates = set(ids) if candidates is None else candidates & ids
+        order = self.spent_order if by_spent else self.id_order
+        if candidates is not None and len(candidates) * 8 < len(order):
+            order = sorted(self._sort_key(customer_id, by_spent) for customer_id in candidates)
+        return order, candidates, by_spent
+
+    def _sort_key(self, customer_id, by_spent):
+        return (self.customers[customer_id]['total_spent'], int(customer_id)) if by_spent else int(customer_id)
+
+    def _walk(self, order, candidates, by_spent, cursor, min_spent, descending):
+        """Yield matching customer ids (with their sort key) from `order`, starting after `cursor`"""
+        if by_spent and min_spent is not None and not descending:
+            floor = (min_spent, -1)
+            cursor = floor if cursor is None else max(cursor, floor)
+        if descending:
+            start = len(order) if cursor is None else bisect.bisect_left(order, cursor)
+            positions = range(start - 1, -1, -1)
+        else:
+            start = 0 if cursor is None else bisect.bisect_right(order, cursor)
+            positions = range(start, len(order))
+        for pos in positions:
+            key = order[pos]
+            customer_id = str(key[1]) if by_spent else str(key)
+            if candidates is not None and customer_id not in candidates:
+                continue
+            if min_spent is not None:
+                spent = key[0] if by_spent else self.customers[customer_id]['total_spent']
+                if spent < min_spent:
+                    if by_spent:
+                        break  # descending walk has passed min_spent
+                    continue
+            yield key, customer_id
+
+    def page(self, limit, cursor=None, membership_level=None, city=None, min_spent=None, sort='id'):
+        """One page of matching customers after `cursor`, plus the sort key to resume from"""
+        result, last = [], None
+        with self.lock:
+            order, candidates, by_spent = self._plan(membership_level, city, sort)
+            for key, customer_id in self._walk(order, candidates, by_spent, cursor, min_spent, sort.startswith('-')):
+                if len(result) == limit:
+                    return result, last
+                result.append(dict(self.customers[customer_id]))
+                last = key
+        return result, None
+
+    def stream(self, membership_level=None, city=None, min_spent=None, sort='id'):
+        """Yield every matching customer in sort order from a snapshot of the index"""
+        with self.lock:
+            order, candidates, by_spent = self._plan(membership_level, city, sort)
+            order = list(order)
+        for _, customer_id in self._walk(order, candidates, by_spent, None, min_spent, sort.startswith('-')):
+            customer = self.get(customer_id)
+            if customer:
+                yield customer
+
+SEED_CUSTOMER = {
+    'id': '1',
+    'email': 'customer@supermarket.com',
+    'name': 'Customer User',
+    'phone': '555-0001',
+    'address': '123 Main St',
+    'city': 'Anytown',
+    'state': 'ST',
+    'zip': '12345',
+    'country': 'USA',
+    'membership_level': 'silver',
+    'total_orders': 5,
+    'total_spent': 250.00,
+    'loyalty_points': 250,
+    'created_at': datetime.now().isoformat(),
+    'updated_at': datetime.now().isoformat()
+}
+
+customers = CustomerStore()
+customer_db_lock = threading.Lock()
+
+def open_customer_db():
+    """Attach SQLite write-behind to the store and warm it from disk, seeding the demo customer on first start.
+
+    Runs once, at startup or on the first request, so importing the module creates no files or threads.
+    """
+    with customer_db_lock:
+        if customers.writer is not None:
+            return
+        db = CustomerDatabase(DB_PATH)
+        saved_customers, saved_preferences, saved_state = db.load()
+        for customer in saved_customers:
+            customers.add(customer, persist=False)
+        customers.preferences.update(saved_preferences)
+        customers.state.update(saved_state)
+        customers.writer = WriteBehindQueue(db, WRITE_BEHIND_INTERVAL)
+        atexit.register(customers.writer.flush)
+        if not saved_customers:
+            customers.add(SEED_CUSTOMER)
+
+@app.before_request
+def ensure_customer_db():
+    if customers.writer is None:
+        open_customer_db()
+
+for _tier, _ in loyalty_rules['tiers']:
+    loyalty_tier_customers.labels(tier=_tier).set_function(lambda tier=_tier: len(customers.by_membership.get(tier, ())))
+
+# ==================== Order History ====================
+
+class OrderHistoryCache:
+    """Short-TTL cache of order history pages, grouped per customer so one order invalidates them all"""
+
+    def __init__(self, ttl, max_customers):
+        self.ttl = ttl
+        self.max_customers = max_customers
+        self.entries = OrderedDict()  # normalized email -> {page params: (expires_at, body)}
+        self.lock = threading.Lock()
+
+    def get(self, email, params):
+        with self.lock:
+            pages = self.entries.get(email)
+            entry = pages.get(params) if pages else None
+            if entry and entry[0] > time.time():
+                self.entries.move_to_end(email)
+                return entry[1]
+        return None
+
+    def put(self, email, params, body):
+        with self.lock:
+            pages = self.entries.setdefault(email, {})
+            pages[params] = (time.time() + self.ttl, body)
+            self.entries.move_to_end(email)
+            while len(self.entries) > self.max_customers:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, email):
+        with self.lock:
+            self.entries.pop(email, None)
+
+order_history = OrderHistoryCache(ORDER_HISTORY_TTL, ORDER_HISTORY_MAX_CUSTOMERS)
+
+# ==================== Order Event Consumer ====================
+
+class OrderEventConsumer:
+    """Follows core-service's order event stream and feeds new orders to the loyalty engine.
+
+    The stream position is saved with the customers. Event IDs restart with core-service, so on every
+    (re)connect the orders created since the newest one seen are also re-read from GET /orders;
+    apply_order drops the ones that were already counted.
+    """
+    STATE_NAME = 'order_events'
+    RECONCILE_PAGE_SIZE = 500
+
+    def __init__(self, url, store):
+        self.url = url
+        self.store = store
+        self.last_event_id = None
+        self.last_order_id = None  # newest order ID seen; IDs are time-ordered
+
+    def start(self):
+        position = self.store.state.get(self.STATE_NAME, {})
+        self.last_event_id = position.get('last_event_id')
+        self.last_order_id = position.get('last_order_id')
+        threading.Thread(target=self.run, name='order-events', daemon=True).start()
+
+    def save_position(self):
+        self.store.save_state(self.STATE_NAME, {'last_event_id': self.last_event_id, 'last_order_id': self.last_order_id})
+
+    def run(self):
+        while True:
+            try:
+                self.consume()
+            except Exception as e:
+                print(f"Order event stream error: {e}")
+            time.sleep(2)
+
+    def consume(self):
+        headers = {'Last-Event-ID': str(self.last_event_id)} if self.last_event_id else {}
+        with requests.get(f'{self.url}/orders/events', headers=headers, stream=True, timeout=(5, 60)) as response:
+            response.raise_for_status()
+            # Subscribed, so newer orders queue up on the stream while the gap is filled
+            self.reconcile()
+            event_id, event_type, data = None, None, []
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    field, _, value = line.partition(':')
+                    value = value[1:] if value.startswith(' ') else value
+                    if field == 'id':
+                        event_id = value
+                    elif field == 'event':
+                        event_type = value
+                    elif field == 'data':
+                        data.append(value)
+                    continue
+                # A blank line terminates one event
+                if event_type in ('order_created', 'order_status_changed') and data:
+                    order = json.loads('\n'.join(data))
+                    if order.get('customer_email'):
+                        order_history.invalidate(CustomerStore.normalize_email(order['customer_email']))
+                    if event_type == 'order_created':
+                        self.handle_order(order)
+                if event_id:
+                    self.last_event_id = event_id
+                    self.save_position()
+                event_id, event_type, data = None, None, []
+
+    def reconcile(self):
+        """Apply the orders created since the newest one seen, oldest first"""
+        params = {'limit': self.RECONCILE_PAGE_SIZE}
+        if self.last_order_id:
+            params['since'] = ((self.last_order_id >> ORDER_ID_TIMESTAMP_SHIFT) + ORDER_ID_EPOCH_MS) / 1000
+        missed = []
+        while True:
+            response = requests.get(f'{self.url}/orders', params=params, timeout=10)
+            response.raise_for_status()
+            page = response.json()
+            missed.extend(page['orders'])
+            if not page['next_cursor']:
+                break
+            params['cursor'] = page['next_cursor']
+        for order in reversed(missed):
+            if order.get('customer_email'):
+                order_history.invalidate(CustomerStore.normalize_email(order['customer_email']))
+            self.handle_order(order)
+        if missed:
+            self.save_position()
+
+    def handle_order(self, order):
+        try:
+            self.last_order_id = max(self.last_order_id or 0, int(order.get('id')))
+        except (TypeError, ValueError):
+            pass
+        email = order.get('customer_email')
+        if not email:
+            loyalty_events.labels(result='anonymous').inc()
+            return
+        loyalty_events.labels(result=self.store.apply_order(email, order.get('id'), order.get('total'))).inc()
+
+order_event_consumer = OrderEventConsumer(CORE_SERVICE_URL, customers)
+
+# ==================== RFM Segmentation ====================
+
+# Order IDs come from core-service's SnowflakeGenerator and embed their creation time
+ORDER_ID_EPOCH_MS = 1704067200000
+ORDER_ID_TIMESTAMP_SHIFT = 22
+RFM_QUANTILES = [0.2, 0.4, 0.6, 0.8]
+
+# First matching rule wins: (segment, min R, max R, min FM, max FM), where FM is the rounded mean of F and M
+RFM_SEGMENT_RULES = [
+    ('champions', 4, 5, 4, 5),
+    ('loyal', 3, 5, 3, 5),
+    ('new', 4, 5, 1, 2),
+    ('at_risk', 1, 2, 3, 5),
+    ('hibernating', 1, 2, 1, 2),
+    ('needs_attention', 1, 5, 1, 5)
+]
+RFM_SEGMENTS = [rule[0] for rule in RFM_SEGMENT_RULES]
+
+def build_segment_grid(rules):
+    """Lookup table indexed by [R, FM] score so segments are assigned with one fancy-index"""
+    grid = np.zeros((6, 6), dtype=np.int64)
+    for code in range(len(rules) - 1, -1, -1):
+        _, r_lo, r_hi, fm_lo, fm_hi = rules[code]
+        grid[r_lo:r_hi + 1, fm_lo:fm_hi + 1] = code
+    return grid
+
+RFM_SEGMENT_GRID = build_segment_grid(RFM_SEGMENT_RULES)
+
+class RFMSegmenter:
+    """Recency/frequency/monetary quintile scores and segments computed over NumPy columns.
+
+    A full run re-derives the quintile edges from every customer. An incremental
+    run scores only customers whose order aggregates changed since the last run,
+    against the edges of the last full run.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.edges = None
+        self.segment_counts = np.zeros(len(RFM_SEGMENTS), dtype=np.int64)
+        self.last_report = None
+        self.run_lock = threading.Lock()
+
+    @staticmethod
+    def _columns(records, now_ms):
+        n = len(records)
+        frequency = np.fromiter((c['total_orders'] for c in records), dtype=np.float64, count=n)
+        monetary = np.fromiter((c['total_spent'] for c in records), dtype=np.float64, count=n)
+        last_ids = np.fromiter((c.get('last_order_id', 0) for c in records), dtype=np.int64, count=n)
+        previous = np.fromiter((int(c.get('rfm_score') or 0) for c in records), dtype=np.int64, count=n)
+        last_ms = (last_ids >> ORDER_ID_TIMESTAMP_SHIFT) + ORDER_ID_EPOCH_MS
+        # Customers with no order on record rank as least recent
+        recency = np.where(last_ids > 0, (now_ms - last_ms) / 86400000.0, np.inf)
+        return recency, frequency, monetary, previous
+
+    @staticmethod
+    def _quantile_edges(values):
+        finite = values[np.isfinite(values)]
+        return np.quantile(finite, RFM_QUANTILES) if len(finite) else np.full(len(RFM_QUANTILES), np.inf)
+
+    def score(self, recency, frequency, monetary):
+        """Quintile scores 1-5 (5 is best) and segment codes for aligned input columns"""
+        r = 5 - np.searchsorted(self.edges['recency'], recency, side='right')
+        f = np.searchsorted(self.edges['frequency'], frequency, side='left') + 1
+        m = np.searchsorted(self.edges['monetary'], monetary, side='left') + 1
+        segments = RFM_SEGMENT_GRID[r, (f + m + 1) // 2]
+        return r, f, m, segments
+
+    def run(self, incremental=False):
+        with self.run_lock:
+            start = time.time()
+            now_ms = int(start * 1000)
+            store = self.store
+            with store.lock:
+                if incremental and self.edges is not None:
+                    ids = [customer_id for customer_id in store.rfm_dirty if customer_id in store.customers]
+                else:
+                    incremental = False
+                    ids = list(store.customers)
+                store.rfm_dirty.clear()
+                records = [store.customers[customer_id] for customer_id in ids]
+                recency, frequency, monetary, previous = self._columns(records, now_ms)
+
+            if not incremental:
+                self.edges = {
+                    'recency': self._quantile_edges(recency),
+                    'frequency': self._quantile_edges(frequency),
+                    'monetary': self._quantile_edges(monetary)
+                }
+            r, f, m, segments = self.score(recency, frequency, monetary)
+            scores = r * 100 + f * 10 + m
+            changed = np.flatnonzero(scores != previous)
+
+            segment_codes = {name: code for code, name in enumerate(RFM_SEGMENTS)}
+            with store.lock:
+                if incremental:
+                    old = [segment_codes.get(records[i].get('rfm_segment'), -1) for i in changed]
+                    np.subtract.at(self.segment_counts, [code for code in old if code >= 0], 1)
+                    np.add.at(self.segment_counts, segments[changed], 1)
+                else:
+                    self.segment_counts = np.bincount(segments, minlength=len(RFM_SEGMENTS))
+                for i in changed:
+                    customer = records[i]
+                    store._update(customer, {'rfm_score': str(scores[i]), 'rfm_segment': RFM_SEGMENTS[segments[i]]})
+                    store._persist('customers', customer['id'], customer)
+
+            duration = time.time() - start
+            mode = 'incremental' if incremental else 'full'
+            rfm_run_duration.labels(mode=mode).observe(duration)
+            rfm_customers_scored.labels(mode=mode).inc(len(ids))
+            for code, name in enumerate(RFM_SEGMENTS):
+                rfm_segment_customers.labels(segment=name).set(int(self.segment_counts[code]))
+            self.last_report = {
+                'mode': mode,
+                'customers_scored': len(ids),
+                'customers_changed': len(changed),
+                'duration_seconds': round(duration, 3),
+                'customers_per_second': round(len(ids) / duration) if duration > 0 else None,
+                'completed_at': datetime.now().isoformat(),
+                'quintile_edges': {name: np.round(edges, 2).tolist() for name, edges in self.edges.items()},
+                'segments': dict(zip(RFM_SEGMENTS, self.segment_counts.tolist()))
+            }
+            return self.last_report
+
+    def start(self, interval):
+        """Run a full segmentation every `interval` seconds in the background"""
+        def loop():
+            while True:
+                try:
+                    self.run()
+                except Exception as e:
+                    print(f"RFM segmentation error: {e}")
+                time.sleep(interval)
+        threading.Thread(target=loop, name='rfm-segmentation', daemon=True).start()
+
+rfm_segmenter = RFMSegmenter(customers)
+
+# ==================== Request Tracing ====================
+
+tracer = init_tracing(app, 'customer-mgmt', caller_is_admin)
+
+# Pooled, traced connections for every call this service makes while handling a request
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', '32'))
+upstream_session = TracedSession()
+upstream_session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=UPSTREAM_POOL_SIZE))
+upstream_session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=UPSTREAM_POOL_SIZE))
+
 @app.before_request
 def before_request():
     request.start_time = time.time()
+    start_trace()
 
 @app.after_request
 def after_request(response):
     if hasattr(request, 'start_time'):
         duration = time.time() - request.start_time
-        request_duration.labels(method=request.method, endpoint=request.path).observe(duration)
+        request_duration.labels(method=request.method, endpoint=request.path).observe(duration, exemplar={'trace_id': g.trace_id})
+        finish_trace(response, duration)
     request_count.labels(method=request.method, endpoint=request.path).inc()
     return response
 
+# ==================== Response Compression ====================
+
+init_compression(app, 'customer_mgmt')
+
 def verify_token(token):
     """Verify token with auth service"""
     try:
         headers = {'Authorization': f'Bearer {token}'}
-        response = requests.get(f'{AUTH_SERVICE_URL}/api/auth/verify', headers=headers, timeout=5)
+        response = upstream_session.get(f'{AUTH_SERVICE_URL}/api/auth/verify', headers=headers, timeout=5)
         if response.status_code == 200:
             return response.json()
         return None
@@ -96,7 +848,7 @@ def health():
 
 @app.route('/metrics', methods=['GET'])
 def metrics():
-    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+    return metrics_response()
 
 # ==================== Customer Profile ====================
 
@@ -106,11 +858,10 @@ def get_current_customer():
     """Get current logged-in customer profile"""
     user_email = request.user.get('email')
     
-    # Find customer by email
-    for customer_id, customer in customers_db.items():
-        if customer['email'] == user_email:
-            customer_operations.labels(operation='profile_view').inc()
-            return jsonify(customer), 200
+    customer = customers.get_by_email(user_email)
+    if customer:
+        customer_operations.labels(operation='profile_view').inc()
+        return jsonify(customer), 200
     
     # Return minimal profile if customer not found
     return jsonify({
@@ -123,107 +874,138 @@ def get_current_customer():
 @token_required
 def update_current_customer():
     """Update current customer profile"""
-    data = request.get_json()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Profile must be a JSON object'}), 400
     user_email = request.user.get('email')
     
-    customer_id = None
-    for cid, customer in customers_db.items():
-        if customer['email'] == user_email:
-            customer_id = cid
-            break
-    
-    if not customer_id:
-        # Create new customer profile
-        customer_id = str(len(customers_db) + 1)
-        customers_db[customer_id] = {
-            'id': customer_id,
-            'email': user_email,
-            'name': request.user.get('name', 'Customer'),
-            'phone': data.get('phone', ''),
-            'address': data.get('address', ''),
-            'city': data.get('city', ''),
-            'state': data.get('state', ''),
-            'zip': data.get('zip', ''),
-            'country': data.get('country', 'USA'),
-            'membership_level': 'bronze',
-            'total_orders': 0,
-            'total_spent': 0.0,
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
-        }
-    else:
-        customer = customers_db[customer_id]
-        if 'name' in data:
-            customer['name'] = data['name']
-        if 'phone' in data:
-            customer['phone'] = data['phone']
-        if 'address' in data:
-            customer['address'] = data['address']
-        if 'city' in data:
-            customer['city'] = data['city']
-        if 'state' in data:
-            customer['state'] = data['state']
-        if 'zip' in data:
-            customer['zip'] = data['zip']
-        if 'country' in data:
-            customer['country'] = data['country']
-        customer['updated_at'] = datetime.now().isoformat()
+    customer = customers.upsert_profile(user_email, request.user.get('name'), data)
     
     customer_operations.labels(operation='profile_update').inc()
     return jsonify({
         'message': 'Profile updated successfully',
-        'customer': customers_db[customer_id]
+        'customer': customer
     }), 200
 
 @app.route('/api/customers/<customer_id>', methods=['GET'])
 @token_required
 def get_customer(customer_id):
     """Get customer profile by ID (admin only through BFF)"""
-    if customer_id not in customers_db:
+    customer = customers.get(customer_id)
+    if not customer:
         return jsonify({'error': 'Customer not found'}), 404
     
     customer_operations.labels(operation='customer_view').inc()
-    return jsonify(customers_db[customer_id]), 200
+    return jsonify(customer), 200
 
 # ==================== Customer List (Admin) ====================
 
 @app.route('/api/customers', methods=['GET'])
 @token_required
 def list_customers():
-    """List all customers (admin only through BFF)"""
-    customer_list = []
-    for customer_id, customer in customers_db.items():
-        customer_list.append({
-            'id': customer_id,
-            'email': customer['email'],
-            'name': customer['name'],
-            'phone': customer['phone'],
-            'city': customer['city'],
-            'membership_level': customer['membership_level'],
-            'total_orders': customer['total_orders'],
-            'total_spent': customer['total_spent'],
-            'created_at': customer['created_at']
-        })
-    
+    """List customers (admin only through BFF).
+
+    Query params: membership_level, city, min_spent, sort (id | total_spent, prefix '-' for
+    descending), limit, cursor, format=ndjson to stream every match instead of one page.
+    """
+    sort = request.args.get('sort', 'id')
+    if sort.lstrip('-') not in ('id', 'total_spent'):
+        return jsonify({'error': 'sort must be id or total_spent (optionally prefixed with -)'}), 400
+    try:
+        filters = {
+            'membership_level': request.args.get('membership_level'),
+            'city': request.args.get('city'),
+            'min_spent': float(request.args['min_spent']) if 'min_spent' in request.args else None,
+            'sort': sort
+        }
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+        cursor = parse_customer_cursor(request.args.get('cursor'), sort)
+    except ValueError:
+        return jsonify({'error': 'Invalid min_spent/limit/cursor parameter'}), 400
+
     customer_operations.labels(operation='list_customers').inc()
-    return jsonify(customer_list), 200
+    if request.args.get('format') == 'ndjson':
+        # The export hands out every customer's email in one response, so it is checked here too, not only in the BFF
+        if not caller_is_admin():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        def stream():
+            for customer in customers.stream(**filters):
+                yield json.dumps(customer_summary(customer)) + '\n'
+        return Response(stream(), mimetype='application/x-ndjson')
+
+    page, last = customers.page(limit, cursor, **filters)
+    return jsonify({
+        'customers': [customer_summary(customer) for customer in page],
+        'count': len(page),
+        'next_cursor': format_customer_cursor(last)
+    }), 200
+
+def customer_summary(customer):
+    return {
+        'id': customer['id'],
+        'email': customer['email'],
+        'name': customer['name'],
+        'phone': customer['phone'],
+        'city': customer['city'],
+        'membership_level': customer['membership_level'],
+        'total_orders': customer['total_orders'],
+        'total_spent': customer['total_spent'],
+        'created_at': customer['created_at']
+    }
+
+def parse_customer_cursor(cursor, sort):
+    """Cursors are the last sort key: '<id>' or '<total_spent>:<id>'"""
+    if not cursor:
+        return None
+    if sort.lstrip('-') == 'total_spent':
+        spent, customer_id = cursor.split(':')
+        return (float(spent), int(customer_id))
+    return int(cursor)
+
+def format_customer_cursor(key):
+    if key is None:
+        return None
+    return f'{key[0]}:{key[1]}' if isinstance(key, tuple) else str(key)
 
 # ==================== Membership & Analytics ====================
 
 @app.route('/api/customers/me/orders', methods=['GET'])
 @token_required
 def get_customer_orders():
-    """Get current customer's order history"""
+    """Get current customer's order history, newest first. Query params: limit, cursor, status"""
     user_email = request.user.get('email')
-    
-    # This would typically query the order service
-    # For now, return empty list
+    email = CustomerStore.normalize_email(user_email)
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    params = (limit, request.args.get('cursor'), request.args.get('status'))
     customer_operations.labels(operation='orders_view').inc()
-    return jsonify({
-        'customer_email': user_email,
-        'orders': [],
-        'total_count': 0
-    }), 200
+
+    body = order_history.get(email, params)
+    if body is None:
+        order_history_cache_lookups.labels(result='miss').inc()
+        query = {'customer_email': email, 'limit': limit}
+        for name, value in zip(('cursor', 'status'), params[1:]):
+            if value:
+                query[name] = value
+        try:
+            response = upstream_session.get(f'{CORE_SERVICE_URL}/orders', params=query, timeout=5)
+        except requests.RequestException as e:
+            return jsonify({'error': f'Order service unavailable: {e}'}), 503
+        if response.status_code != 200:
+            return jsonify(response.json()), response.status_code
+        page = response.json()
+        body = {
+            'customer_email': user_email,
+            'orders': page['orders'],
+            'count': page['count'],
+            'next_cursor': page['next_cursor']
+        }
+        order_history.put(email, params, body)
+    else:
+        order_history_cache_lookups.labels(result='hit').inc()
+    return jsonify(body), 200
 
 @app.route('/api/customers/me/preferences', methods=['GET', 'PUT'])
 @token_required
@@ -235,20 +1017,16 @@ def customer_preferences():
         customer_operations.labels(operation='preferences_view').inc()
         return jsonify({
             'customer_email': user_email,
-            'preferences': {
-                'notifications_email': True,
-                'notifications_sms': False,
-                'newsletter': True,
-                'language': 'en',
-                'currency': 'USD'
-            }
+            'preferences': customers.get_preferences(user_email)
         }), 200
     else:  # PUT
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Preferences must be a JSON object'}), 400
         customer_operations.labels(operation='preferences_update').inc()
         return jsonify({
             'message': 'Preferences updated',
-            'preferences': data
+            'preferences': customers.update_preferences(user_email, data)
         }), 200
 
 # ==================== Loyalty & Rewards ====================
@@ -258,21 +1036,87 @@ def customer_preferences():
 def get_loyalty_info():
     """Get customer loyalty/membership info"""
     user_email = request.user.get('email')
+    customer = customers.get_by_email(user_email) or {}
+    points = customer.get('loyalty_points', 0)
+    tier = loyalty_tier(points)
+    tiers = loyalty_rules['tiers']
+    next_tiers = [(name, threshold) for name, threshold in tiers if threshold > points]
     
     customer_operations.labels(operation='loyalty_view').inc()
     return jsonify({
         'customer_email': user_email,
-        'membership_level': 'silver',
-        'points': 250,
-        'tier': 'Silver',
-        'benefits': [
-            '5% discount on all purchases',
-            'Free shipping on orders over $50',
-            'Exclusive member-only deals'
-        ],
-        'next_tier': 'Gold',
-        'points_to_next_tier': 750
+        'membership_level': tier,
+        'points': points,
+        'tier': tier.capitalize(),
+        'benefits': TIER_BENEFITS.get(tier, []),
+        'next_tier': next_tiers[0][0].capitalize() if next_tiers else None,
+        'points_to_next_tier': next_tiers[0][1] - points if next_tiers else 0
     }), 200
 
+@app.route('/api/loyalty/recompute', methods=['POST'])
+@token_required
+def recompute_loyalty():
+    """Batch re-derive points and tiers for all customers, optionally with new rules (admin only)"""
+    if request.user.get('role') != 'admin':
+        return jsonify({'error': 'Insufficient permissions'}), 403
+    data = request.get_json(silent=True) or {}
+    rules = dict(loyalty_rules)
+    try:
+        if 'points_per_dollar' in data:
+            rules['points_per_dollar'] = float(data['points_per_dollar'])
+        if 'tiers' in data:
+            rules['tiers'] = sorted(((str(name), int(threshold)) for name, threshold in data['tiers'].items()),
+                                    key=lambda tier: tier[1])
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({'error': 'tiers must map tier name to a points threshold'}), 400
+    if not (math.isfinite(rules['points_per_dollar']) and rules['points_per_dollar'] >= 0):
+        return jsonify({'error': 'points_per_dollar must be a finite number of at least 0'}), 400
+    if not rules['tiers'] or rules['tiers'][0][1] != 0:
+        return jsonify({'error': 'The lowest tier must start at 0 points'}), 400
+
+    start = time.time()
+    loyalty_rules.update(rules)
+    # Drop series for tiers the new rules no longer have
+    loyalty_tier_customers.clear()
+    for tier, _ in rules['tiers']:
+        loyalty_tier_customers.labels(tier=tier).set_function(lambda tier=tier: len(customers.by_membership.get(tier, ())))
+    scanned, changed = customers.recompute_loyalty(rules)
+    duration = time.time() - start
+    loyalty_recompute_duration.observe(duration)
+    customer_operations.labels(operation='loyalty_recompute').inc()
+    return jsonify({
+        'rules': {'points_per_dollar': rules['points_per_dollar'], 'tiers': dict(rules['tiers'])},
+        'customers_scanned': scanned,
+        'customers_changed': changed,
+        'duration_seconds': round(duration, 3)
+    }), 200
+
+# ==================== Customer Segmentation (Admin) ====================
+
+@app.route('/api/segments/rfm', methods=['GET', 'POST'])
+@token_required
+def rfm_segments():
+    """Last RFM segmentation report, or run one now with {"mode": "full" | "incremental"} (admin only)"""
+    if request.user.get('role') != 'admin':
+        return jsonify({'error': 'Insufficient permissions'}), 403
+    if request.method == 'GET':
+        if rfm_segmenter.last_report is None:
+            return jsonify({'error': 'Segmentation has not run yet'}), 404
+        return jsonify(rfm_segmenter.last_report), 200
+
+    mode = (request.get_json(silent=True) or {}).get('mode', 'full')
+    if mode not in ('full', 'incremental'):
+        return jsonify({'error': 'mode must be full or incremental'}), 400
+    customer_operations.labels(operation=f'rfm_{mode}').inc()
+    return jsonify(rfm_segmenter.run(incremental=mode == 'incremental')), 200
+
+# ==================== Sampling Profiler ====================
+
+init_profiling(app, tracer.service_name, caller_is_admin)
+
 if __name__ == '__main__':
+    open_customer_db()
+    order_event_consumer.start()
+    if RFM_JOB_INTERVAL > 0:
+        rfm_segmenter.start(RFM_JOB_INTERVAL)
     app.run(host='0.0.0.0', port=5004, debug=False)
@@ -2,29 +2,144 @@
 UI Service
 Frontend server for the supermarket application
 """
-from flask import Flask, jsonify, send_from_directory, request, Response
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from flask import Flask, jsonify, request, Response, g
+from prometheus_client import Counter, Gauge, Histogram
+from common.admin import caller_is_admin
+from common.profiling import init_profiling
+from common.tracing import TracedSession, init_tracing, start_trace, finish_trace, metrics_response
 import time
 from datetime import datetime
+import gzip
+import hashlib
+import http.cookiejar
+import json
+import math
+import mimetypes
 import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
 import requests
 
-app = Flask(__name__, static_folder='static', static_url_path='')
+try:
+    import brotli
+except ImportError:  # brotli variants are skipped; gzip and identity still work
+    brotli = None
+
+# Static files are served from memory by StaticBundle, not Flask's disk-backed static route
+app = Flask(__name__, static_folder=None)
 
 # Prometheus metrics
 request_count = Counter('ui_service_requests_total', 'Total requests', ['method', 'endpoint'])
 request_duration = Histogram('ui_service_request_duration_seconds', 'Request duration', ['method', 'endpoint'])
 page_views = Counter('page_views_total', 'Page views', ['page'])
+proxy_bytes = Counter('ui_proxy_bytes_total', 'Body bytes relayed by the API proxy', ['direction'])
+proxy_ttfb = Histogram('ui_proxy_time_to_first_byte_seconds', 'Time from forwarding a request to the BFF until its response headers arrive')
+proxy_responses = Counter('ui_proxy_responses_total', 'API proxy responses by relay mode', ['mode'])
+static_responses = Counter('ui_static_responses_total', 'Static asset responses', ['encoding', 'status'])
+static_bytes = Counter('ui_static_bytes_sent_total', 'Static asset body bytes sent', ['encoding'])
+health_probe_up = Gauge('ui_health_probe_up', 'Whether the last health probe of a target succeeded', ['target'])
+health_probe_latency = Gauge('ui_health_probe_latency_seconds', 'Duration of the last health probe of a target', ['target'])
+health_probe_failures = Gauge('ui_health_probe_consecutive_failures', 'Consecutive failed health probes of a target', ['target'])
+health_probe_last_check = Gauge('ui_health_probe_last_check_timestamp_seconds', 'When a target was last probed', ['target'])
+prometheus_cache_lookups = Counter('ui_prometheus_cache_lookups_total', 'Prometheus proxy lookups by outcome', ['kind', 'result'])
+prometheus_upstream_queries = Counter('ui_prometheus_upstream_queries_total', 'Queries actually sent to Prometheus', ['kind'])
+dashboard_duration = Histogram('ui_dashboard_duration_seconds', 'Time to evaluate a batched dashboard request')
+live_subscribers = Gauge('ui_live_metrics_subscribers', 'Connected live metrics stream subscribers')
+live_push_latency = Histogram('ui_live_metrics_push_latency_seconds', 'Time from a value changing to it being written to a subscriber',
+                              buckets=(.001, .005, .01, .05, .1, .5, 1, 5, 15))
+live_updates_coalesced = Counter('ui_live_metrics_coalesced_total', 'Changes merged into a subscriber update that was not yet sent')
+live_evaluation_duration = Histogram('ui_live_metrics_evaluation_seconds', 'Time to evaluate all live metrics queries once')
+
+# ==================== Static Assets ====================
+
+STATIC_DIR = Path(__file__).resolve().parent / 'static'
+STATIC_MIN_COMPRESS_BYTES = 1024
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+class StaticBundle:
+    """The static/ directory held in memory with gzip/brotli variants and ETags computed once at startup.
+
+    Non-HTML assets are also published under a content-hashed name (auth-helper.<hash>.js)
+    that is cached for a year; HTML pages are rewritten to reference those names and are
+    always revalidated, so a deploy is picked up on the next page load.
+    """
+
+    def __init__(self, root):
+        self.assets = {}  # URL name -> asset
+        files = sorted(path for path in root.rglob('*') if path.is_file())
+        hashed_names = {}
+        for path in files:
+            if path.suffix != '.html':
+                name = path.relative_to(root).as_posix()
+                asset = self._build(name, path.read_bytes(), 'no-cache')
+                hashed = f"{path.with_suffix('').relative_to(root).as_posix()}.{asset['hash'][:12]}{path.suffix}"
+                self.assets[name] = asset
+                self.assets[hashed] = dict(asset, cache_control=IMMUTABLE_CACHE_CONTROL)
+                hashed_names[name] = hashed
+        for path in files:
+            if path.suffix == '.html':
+                html = path.read_text(encoding='utf-8')
+                for name, hashed in hashed_names.items():
+                    html = html.replace(f'"/{name}"', f'"/{hashed}"')
+                name = path.relative_to(root).as_posix()
+                self.assets[name] = self._build(name, html.encode('utf-8'), 'no-cache')
+
+    @staticmethod
+    def _build(name, content, cache_control):
+        digest = hashlib.sha1(content).hexdigest()
+        variants = {'identity': content}
+        if len(content) >= STATIC_MIN_COMPRESS_BYTES:
+            compressed = {'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed['br'] = brotli.compress(content, quality=11)
+            variants.update({encoding: body for encoding, body in compressed.items() if len(body) < len(content)})
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        return {'hash': digest, 'variants': variants, 'mimetype': mimetype, 'cache_control': cache_control}
+
+    def response(self, name):
+        """Serve the best encoding the client accepts, answering 304 when its ETag still matches"""
+        asset = self.assets.get(name)
+        if asset is None:
+            return jsonify({'error': 'Not found'}), 404
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in asset['variants'] and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+        body = asset['variants'][encoding]
+        response = Response(body, mimetype=asset['mimetype'])
+        # Each encoding is a different representation, so it needs its own strong ETag
+        response.set_etag(asset['hash'][:20] if encoding == 'identity' else f"{asset['hash'][:20]}-{encoding}")
+        response.headers['Cache-Control'] = asset['cache_control']
+        response.headers['Vary'] = 'Accept-Encoding'
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response = response.make_conditional(request)
+        static_responses.labels(encoding=encoding, status=str(response.status_code)).inc()
+        if response.status_code == 200:
+            static_bytes.labels(encoding=encoding).inc(len(body))
+        return response
+
+static_bundle = StaticBundle(STATIC_DIR)
+
+# ==================== Request Tracing ====================
+
+tracer = init_tracing(app, 'ui-service', caller_is_admin)
 
 @app.before_request
 def before_request():
     request.start_time = time.time()
+    start_trace()
 
 @app.after_request
 def after_request(response):
     if hasattr(request, 'start_time'):
         duration = time.time() - request.start_time
-        request_duration.labels(method=request.method, endpoint=request.path).observe(duration)
+        request_duration.labels(method=request.method, endpoint=request.path).observe(duration, exemplar={'trace_id': g.trace_id})
+        finish_trace(response, duration)
     request_count.labels(method=request.method, endpoint=request.path).inc()
     return response
 
@@ -34,60 +149,100 @@ def health():
 
 @app.route('/metrics', methods=['GET'])
 def metrics():
-    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+    return metrics_response()
 
 @app.route('/', methods=['GET'])
 def index():
     page_views.labels(page='home').inc()
-    return send_from_directory('static', 'index.html')
+    return static_bundle.response('index.html')
 
 @app.route('/login', methods=['GET'])
 @app.route('/login.html', methods=['GET'])
 def login_page():
     page_views.labels(page='login').inc()
-    return send_from_directory('static', 'login.html')
+    return static_bundle.response('login.html')
 
 @app.route('/register', methods=['GET'])
 @app.route('/register.html', methods=['GET'])
 def register_page():
     page_views.labels(page='register').inc()
-    return send_from_directory('static', 'register.html')
+    return static_bundle.response('register.html')
 
 
 @app.route('/products', methods=['GET'])
 def products_page():
     page_views.labels(page='products').inc()
-    return send_from_directory('static', 'products.html')
+    return static_bundle.response('products.html')
 
 @app.route('/cart', methods=['GET'])
 def cart_page():
     """Shopping cart page"""
     page_views.labels(page='cart').inc()
-    return send_from_directory('static', 'cart.html')
+    return static_bundle.response('cart.html')
 
 @app.route('/orders', methods=['GET'])
 def orders_page():
     page_views.labels(page='orders').inc()
-    return send_from_directory('static', 'orders.html')
+    return static_bundle.response('orders.html')
 
 @app.route('/admin', methods=['GET'])
 def admin_page():
     """Admin dashboard for product and inventory management"""
     page_views.labels(page='admin').inc()
-    return send_from_directory('static', 'admin.html')
+    return static_bundle.response('admin.html')
 
 @app.route('/inventory', methods=['GET'])
 def inventory_page():
     """Inventory management page"""
     page_views.labels(page='inventory').inc()
-    return send_from_directory('static', 'inventory.html')
+    return static_bundle.response('inventory.html')
 
 @app.route('/monitoring', methods=['GET'])
 def monitoring_page():
     """System monitoring and status dashboard"""
     page_views.labels(page='monitoring').inc()
-    return send_from_directory('static', 'monitoring.html')
+    return static_bundle.response('monitoring.html')
+
+
+# ==================== API Proxy ====================
+
+PROXY_POOL_SIZE = int(os.getenv('UI_PROXY_POOL_SIZE', '32'))
+PROXY_BUFFER_LIMIT = 64 * 1024  # bodies up to this size are read whole; larger ones are streamed
+PROXY_CHUNK_SIZE = 64 * 1024
+# Hop-by-hop headers describe one connection and must not be forwarded
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailer',
+                      'transfer-encoding', 'upgrade'}
+PROXY_SKIP_REQUEST_HEADERS = HOP_BY_HOP_HEADERS | {'host', 'content-length'}
+PROXY_SKIP_RESPONSE_HEADERS = HOP_BY_HOP_HEADERS
+
+# One keep-alive pool to the BFF shared by every proxied call
+bff_session = TracedSession()
+bff_session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=PROXY_POOL_SIZE))
+bff_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=PROXY_POOL_SIZE))
+# Never keep upstream cookies: the session is shared by all browsers
+bff_session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
 
+class RequestBodyStream:
+    """The incoming request body as a sized file-like object, so requests streams it with its Content-Length"""
+
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        return self.stream.read(PROXY_CHUNK_SIZE if size is None or size < 0 else size)
+
+    def __iter__(self):
+        return iter(lambda: self.stream.read(PROXY_CHUNK_SIZE), b'')
+
+def chunked_request_body(stream):
+    """An incoming body of unknown length, chunk by chunk; requests forwards a generator chunked as well"""
+    for chunk in iter(lambda: stream.read(PROXY_CHUNK_SIZE), b''):
+        proxy_bytes.labels(direction='request').inc(len(chunk))
+        yield chunk
 
 @app.route('/api/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
 def proxy_api(path):
@@ -110,25 +265,65 @@ def proxy_api(path):
         resp.headers['Access-Control-Allow-Methods'] = 'GET,POST,PUT,DELETE,OPTIONS'
         return resp
 
+    if not request.headers.get('Content-Length', '0').strip().isdigit():
+        # Werkzeug reads a malformed length as an empty body; forwarding that would silently drop the upload
+        return jsonify({'error': 'Invalid Content-Length header'}), 400
+
+    headers = {name: value for name, value in request.headers if name.lower() not in PROXY_SKIP_REQUEST_HEADERS}
+    body = None
+    if request.content_length:
+        # Small bodies are read whole; larger ones stream upstream as they arrive
+        body = request.get_data() if request.content_length <= PROXY_BUFFER_LIMIT \
+            else RequestBodyStream(request.stream, request.content_length)
+        proxy_bytes.labels(direction='request').inc(request.content_length)
+    elif 'chunked' in request.headers.get('Transfer-Encoding', '').lower():
+        body = chunked_request_body(request.stream)
+
     try:
-        # Forward the request
-        resp = requests.request(
+        started = time.time()
+        resp = bff_session.request(
             method=request.method,
             url=target_url,
-            headers={key: value for key, value in request.headers if key != 'Host'},
+            headers=headers,
             params=request.args,
-            data=request.get_data(),
-            timeout=10
+            data=body,
+            stream=True,
+            timeout=(5, 30)
         )
-
-        excluded_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
-        headers = [(name, value) for (name, value) in resp.raw.headers.items() if name.lower() not in excluded_headers]
-
-        response = Response(resp.content, resp.status_code, headers)
-        return response
+        proxy_ttfb.observe(time.time() - started)
     except Exception as e:
         return jsonify({'error': str(e)}), 502
 
+    # Bytes are relayed exactly as received, so Content-Encoding and Content-Length stay valid
+    headers = [(name, value) for name, value in resp.raw.headers.items() if name.lower() not in PROXY_SKIP_RESPONSE_HEADERS]
+    length = resp.headers.get('Content-Length', '')
+    if length.isdigit() and int(length) <= PROXY_BUFFER_LIMIT:
+        # Read small bodies at once so the pooled connection is released before the client is served
+        content = resp.raw.read(decode_content=False)
+        resp.raw.release_conn()
+        proxy_responses.labels(mode='buffered').inc()
+        proxy_bytes.labels(direction='response').inc(len(content))
+        return Response(content, resp.status_code, headers)
+
+    def relay():
+        drained = False
+        try:
+            for chunk in resp.raw.stream(PROXY_CHUNK_SIZE, decode_content=False):
+                proxy_bytes.labels(direction='response').inc(len(chunk))
+                yield chunk
+            drained = True
+        finally:
+            # A fully read connection goes back to the pool; one abandoned mid-body must be closed
+            resp.raw.release_conn() if drained else resp.close()
+
+    proxy_responses.labels(mode='streamed').inc()
+    return Response(relay(), resp.status_code, headers, direct_passthrough=True)
+
+@app.route('/<path:filename>', methods=['GET'])
+def static_asset(filename):
+    """Static assets (auth-helper.js, its content-hashed alias, and the raw .html files)"""
+    return static_bundle.response(filename)
+
 @app.route('/config', methods=['GET'])
 def get_config():
     """Get UI configuration"""
@@ -141,92 +336,339 @@ def get_config():
 BFF_SERVICE_URL = os.getenv('BFF_SERVICE_URL', 'http://bff-service:5000')
 PROMETHEUS_URL = os.getenv('PROMETHEUS_URL', 'http://prometheus:9090')
 
+# Validators forwarded upstream and headers relayed back for catalog reads
+CONDITIONAL_REQUEST_HEADERS = ('If-None-Match', 'If-Modified-Since')
+CONDITIONAL_RESPONSE_HEADERS = ('ETag', 'Last-Modified', 'X-Catalog-Version')
+
+def proxy_conditional_get(url):
+    """Forward a GET with its cache validators and relay the upstream body, ETag and 304s as-is"""
+    headers = {name: request.headers[name] for name in CONDITIONAL_REQUEST_HEADERS if name in request.headers}
+    response = bff_session.get(url, headers=headers, params=request.args, timeout=5)
+    relayed = {name: response.headers[name] for name in CONDITIONAL_RESPONSE_HEADERS if name in response.headers}
+    return Response(response.content, response.status_code, relayed, mimetype='application/json')
+
+
+# ==================== Health Prober ====================
+
+HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL_SECONDS', '10'))
+HEALTH_PROBE_TIMEOUT = 2
+
+class HealthProber:
+    """Probes every dependency concurrently on an interval and keeps the latest results in memory"""
+
+    def __init__(self, targets, interval, timeout):
+        self.targets = targets
+        self.interval = interval
+        self.timeout = timeout
+        self.snapshot = {t['name']: {'name': t['name'], 'status': 'unknown', 'port': t['port'], 'url': t['url'],
+                                     'error': None, 'last_checked': None, 'latency_ms': None, 'consecutive_failures': 0}
+                         for t in targets}
+        self.executor = ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix='health-probe')
+        self.lock = threading.Lock()
+        self.started = False
+
+    def probe(self, target):
+        """Try /health, then the target's fallback path; returns (healthy, error)"""
+        error = None
+        for path in ('/health', target['fallback']):
+            try:
+                if requests.get(f"{target['url']}{path}", timeout=self.timeout).ok:
+                    return True, None
+                error = f'{path or "/"} returned an error status'
+            except requests.RequestException as e:
+                error = f'{path or "/"}: {e.__class__.__name__}'
+        return False, error
+
+    def check(self, target):
+        start = time.time()
+        healthy, error = self.probe(target)
+        latency = time.time() - start
+        name = target['name']
+        with self.lock:
+            previous = self.snapshot[name]
+            failures = 0 if healthy else previous['consecutive_failures'] + 1
+            self.snapshot[name] = dict(previous, status='healthy' if healthy else 'unhealthy', error=error,
+                                       last_checked=datetime.now().isoformat(), latency_ms=round(latency * 1000, 1),
+                                       consecutive_failures=failures)
+        health_probe_up.labels(target=name).set(1 if healthy else 0)
+        health_probe_latency.labels(target=name).set(latency)
+        health_probe_failures.labels(target=name).set(failures)
+        health_probe_last_check.labels(target=name).set(time.time())
+
+    def sweep(self):
+        # A dead target costs one timeout for the whole sweep, not one per target
+        for future in [self.executor.submit(self.check, target) for target in self.targets]:
+            future.result()
+
+    def run(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Health probe error: {e}")
+            time.sleep(self.interval)
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, name='health-prober', daemon=True).start()
+
+    def results(self):
+        with self.lock:
+            return [dict(self.snapshot[t['name']]) for t in self.targets]
+
+health_prober = HealthProber([
+    {'name': 'BFF Service', 'url': os.getenv('BFF_SERVICE_URL', 'http://bff-service:5000'), 'port': 5000, 'fallback': ''},
+    {'name': 'Core Service', 'url': os.getenv('CORE_SERVICE_URL', 'http://core-service:5001'), 'port': 5001, 'fallback': ''},
+    {'name': 'UI Service', 'url': os.getenv('UI_SERVICE_URL', 'http://ui-service:5002'), 'port': 5002, 'fallback': ''},
+    {'name': 'Prometheus', 'url': os.getenv('PROMETHEUS_URL', 'http://prometheus:9090'), 'port': 9090, 'fallback': '/metrics'},
+    {'name': 'Grafana', 'url': os.getenv('GRAFANA_URL', 'http://grafana:3000'), 'port': 3000, 'fallback': ''}
+], HEALTH_PROBE_INTERVAL, HEALTH_PROBE_TIMEOUT)
 
 @app.route('/api/health', methods=['GET'])
 def api_health():
-    """Aggregate health status for all services (queried server-side).
-    This avoids the browser needing to call localhost: ports that are unreachable
+    """Aggregate health status for all services, answered from the background prober's snapshot.
+    Probing server-side avoids the browser needing to call localhost: ports that are unreachable
     when the app is accessed from outside the container (e.g., Codespaces).
     """
-    services = [
-        {'name': 'BFF Service', 'url': os.getenv('BFF_SERVICE_URL', 'http://bff-service:5000'), 'port': 5000},
-        {'name': 'Core Service', 'url': os.getenv('CORE_SERVICE_URL', 'http://core-service:5001'), 'port': 5001},
-        {'name': 'UI Service', 'url': os.getenv('UI_SERVICE_URL', 'http://ui-service:5002'), 'port': 5002},
-        {'name': 'Prometheus', 'url': os.getenv('PROMETHEUS_URL', 'http://prometheus:9090'), 'port': 9090},
-        {'name': 'Grafana', 'url': os.getenv('GRAFANA_URL', 'http://grafana:3000'), 'port': 3000}
-    ]
-
-    results = []
-    for s in services:
-        status = 'unhealthy'
-        try:
-            # Prefer /health if available
-            try:
-                r = requests.get(f"{s['url']}/health", timeout=2)
-                if r.ok:
-                    status = 'healthy'
-                else:
-                    # If /health exists but is not OK (e.g., 404), try sensible fallbacks
-                    try:
-                        if s['name'] == 'Prometheus':
-                            r2 = requests.get(f"{s['url']}/metrics", timeout=2)
-                            if r2.status_code == 200:
-                                status = 'healthy'
-                        else:
-                            r2 = requests.get(s['url'], timeout=2)
-                            if r2.ok:
-                                status = 'healthy'
-                    except Exception:
-                        status = 'unhealthy'
-            except Exception:
-                # If requesting /health raised an exception, try fallbacks
-                try:
-                    if s['name'] == 'Prometheus':
-                        r = requests.get(f"{s['url']}/metrics", timeout=2)
-                        if r.status_code == 200:
-                            status = 'healthy'
-                    else:
-                        r = requests.get(s['url'], timeout=2)
-                        if r.ok:
-                            status = 'healthy'
-                except Exception:
-                    status = 'unhealthy'
-        except Exception:
-            status = 'unhealthy'
-
-        results.append({'name': s['name'], 'status': status, 'port': s['port'], 'url': s['url']})
-
-    return jsonify(results), 200
+    health_prober.start()
+    return jsonify(health_prober.results()), 200
 
 @app.route('/api/products', methods=['GET', 'POST'])
 def proxy_products():
     """Proxy products endpoint to BFF service"""
     try:
         if request.method == 'POST':
-            response = requests.post(f'{BFF_SERVICE_URL}/api/products', json=request.json, timeout=5)
+            response = bff_session.post(f'{BFF_SERVICE_URL}/api/products', json=request.json, timeout=5)
         else:
-            response = requests.get(f'{BFF_SERVICE_URL}/api/products', timeout=5)
+            return proxy_conditional_get(f'{BFF_SERVICE_URL}/api/products')
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
 
 
+# ==================== Trace Lookup ====================
+
+TRACE_SOURCES = {
+    'bff': BFF_SERVICE_URL,
+    'core-service': os.getenv('CORE_SERVICE_URL', 'http://core-service:5001'),
+    'customer-mgmt': os.getenv('CUSTOMER_MGMT_URL', 'http://customer-mgmt:5004'),
+    'auth-service': os.getenv('AUTH_SERVICE_URL', 'http://auth-service:5003'),
+}
+TRACE_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+trace_executor = ThreadPoolExecutor(max_workers=len(TRACE_SOURCES), thread_name_prefix='trace-lookup')
+
+def fetch_spans(url, trace_id, auth):
+    response = requests.get(f'{url}/traces/{trace_id}', headers={'Authorization': auth}, timeout=2)
+    response.raise_for_status()
+    return response.json()['spans']
+
+@app.route('/api/traces/<trace_id>', methods=['GET'])
+def get_distributed_trace(trace_id):
+    """Spans of one trace gathered from every service's recent-span buffer, ordered by start time"""
+    if not caller_is_admin():
+        return jsonify({'error': 'Admin token required'}), 403
+    if not TRACE_ID_RE.match(trace_id):
+        return jsonify({'error': 'trace_id must be 32 lowercase hex characters'}), 400
+    # Every service checks the same admin token again before handing out its spans
+    auth = request.headers['Authorization']
+    futures = {name: trace_executor.submit(fetch_spans, url, trace_id, auth) for name, url in TRACE_SOURCES.items()}
+    spans = tracer.find(trace_id)
+    sources = {'ui-service': 'ok'}
+    for name, future in futures.items():
+        try:
+            spans.extend(future.result())
+            sources[name] = 'ok'
+        except Exception as e:
+            sources[name] = f'unavailable: {e.__class__.__name__}'
+    spans.sort(key=lambda s: s['start'])
+    return jsonify({'trace_id': trace_id, 'spans': spans, 'sources': sources}), 200
+
+
+# ==================== Prometheus Query Cache ====================
+
+PROMETHEUS_CACHE_TTL = float(os.getenv('PROMETHEUS_CACHE_TTL_SECONDS', '5'))
+PROMETHEUS_CACHE_MAX_ENTRIES = 512
+# Range points newer than this may still change as late scrapes land, so they are always re-fetched
+PROMETHEUS_SETTLE_SECONDS = 60
+PROMETHEUS_MAX_POINTS = 11000  # Prometheus's own per-series limit for query_range
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'y': 31536000}
+
+def parse_prometheus_time(value):
+    """Unix seconds or RFC 3339, as accepted by the Prometheus HTTP API"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+def parse_prometheus_duration(value):
+    """Float seconds or a Prometheus duration such as 30s, 1m or 1h30m"""
+    try:
+        seconds = float(value)
+    except ValueError:
+        parts = re.findall(r'(\d+(?:\.\d+)?)(ms|[smhdwy])', value)
+        if not parts or ''.join(n + u for n, u in parts) != value:
+            raise ValueError(f'invalid duration {value!r}')
+        seconds = sum(float(n) * DURATION_UNITS[u] for n, u in parts)
+    if seconds <= 0:
+        raise ValueError('duration must be positive')
+    return seconds
+
+class PrometheusQueryCache:
+    """Shared front for Prometheus queries so load stays flat as dashboard viewers increase.
+
+    Queries are normalized and their times aligned (instant queries to the TTL, ranges to
+    the step), so every viewer asks the same question. Answers are kept for a short TTL,
+    concurrent identical queries share one upstream call, and each (query, step) keeps its
+    settled range points so a sliding window only fetches the steps it has not seen.
+    """
+
+    def __init__(self, url, ttl, max_entries):
+        self.url = url
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.results = OrderedDict()  # key -> (expires_at, status, body)
+        self.inflight = {}  # key -> Future of (status, body)
+        self.windows = OrderedDict()  # (query, step) -> settled range points
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query):
+        return ' '.join(query.split())
+
+    def _remember(self, store, key, value):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self.max_entries:
+            store.popitem(last=False)
+
+    def _upstream(self, kind, path, params, timeout):
+        prometheus_upstream_queries.labels(kind=kind).inc()
+        r = requests.get(f'{self.url}{path}', params=params, timeout=timeout)
+        return r.status_code, r.json()
+
+    def _single_flight(self, kind, key, fetch):
+        """Answer from the cache, join an identical in-flight query, or run `fetch` once for everyone"""
+        with self.lock:
+            cached = self.results.get(key)
+            if cached and cached[0] > time.time():
+                prometheus_cache_lookups.labels(kind=kind, result='hit').inc()
+                return cached[1], cached[2]
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+        if not leader:
+            prometheus_cache_lookups.labels(kind=kind, result='coalesced').inc()
+            return future.result()
+
+        prometheus_cache_lookups.labels(kind=kind, result='miss').inc()
+        try:
+            status, body = fetch()
+            if status == 200 and body.get('status') == 'success':
+                with self.lock:
+                    self._remember(self.results, key, (time.time() + self.ttl, status, body))
+            future.set_result((status, body))
+            return status, body
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def query(self, query, at=None):
+        query = self.normalize(query)
+        if at is None:
+            now = time.time()
+            at = now - now % self.ttl
+        params = {'query': query, 'time': at}
+        return self._single_flight('query', ('query', query, at),
+                                   lambda: self._upstream('query', '/api/v1/query', params, 5))
+
+    def query_range(self, query, start, end, step):
+        query = self.normalize(query)
+        start, end = start - start % step, end - end % step
+        return self._single_flight('query_range', ('query_range', query, step, start, end),
+                                   lambda: self._fetch_range(query, start, end, step))
+
+    def _fetch_range(self, query, start, end, step):
+        key = (query, step)
+        with self.lock:
+            window = self.windows.get(key)
+            # Reuse settled points only if they cover the start of this range without gaps
+            if window and window['start'] <= start <= window['settled_end'] + step:
+                fetch_from = max(start, window['settled_end'] + step)
+            else:
+                window = None
+                fetch_from = start
+
+        if fetch_from <= end:
+            params = {'query': query, 'start': fetch_from, 'end': end, 'step': step}
+            status, body = self._upstream('query_range', '/api/v1/query_range', params, 10)
+            if status != 200 or body.get('status') != 'success' or body['data']['resultType'] != 'matrix':
+                return status, body
+            if window is not None:
+                prometheus_cache_lookups.labels(kind='query_range', result='extended').inc()
+        else:
+            body = None
+
+        now = time.time()
+        settled = now - now % step - PROMETHEUS_SETTLE_SECONDS
+        with self.lock:
+            if window is None:
+                window = {'start': start, 'settled_end': start - step, 'series': {}}
+            series = window['series']
+            if body is not None:
+                for entry in series.values():
+                    # Unsettled points from an earlier fetch are replaced by this one
+                    for ts in [ts for ts in entry['values'] if ts >= fetch_from]:
+                        del entry['values'][ts]
+                for result in body['data']['result']:
+                    labels = tuple(sorted(result['metric'].items()))
+                    entry = series.setdefault(labels, {'metric': result['metric'], 'values': {}})
+                    entry['values'].update((ts, value) for ts, value in result['values'])
+                window['settled_end'] = max(window['settled_end'], min(end, settled - settled % step))
+            # Drop points that slid out of a bounded window
+            horizon = end - PROMETHEUS_MAX_POINTS * step
+            if window['start'] < horizon:
+                window['start'] = horizon
+                for entry in series.values():
+                    for ts in [ts for ts in entry['values'] if ts < horizon]:
+                        del entry['values'][ts]
+            self._remember(self.windows, key, window)
+
+            result = []
+            for entry in series.values():
+                values = [[ts, entry['values'][ts]] for ts in sorted(entry['values']) if start <= ts <= end]
+                if values:
+                    result.append({'metric': entry['metric'], 'values': values})
+        return 200, {'status': 'success', 'data': {'resultType': 'matrix', 'result': result}}
+
+prometheus_cache = PrometheusQueryCache(PROMETHEUS_URL, PROMETHEUS_CACHE_TTL, PROMETHEUS_CACHE_MAX_ENTRIES)
+
 @app.route('/api/prometheus/query', methods=['GET'])
 def prometheus_query():
-    """Proxy a Prometheus instant query. Query string param: `query`"""
+    """Proxy a Prometheus instant query through the shared cache. Query string params: `query`, optional `time`"""
     q = request.args.get('query')
     if not q:
         return jsonify({'error': 'missing query parameter'}), 400
     try:
-        r = requests.get(f"{PROMETHEUS_URL}/api/v1/query", params={'query': q}, timeout=5)
-        return jsonify(r.json()), r.status_code
+        at = parse_prometheus_time(request.args['time']) if 'time' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'invalid time parameter'}), 400
+    try:
+        status, body = prometheus_cache.query(q, at)
+        return jsonify(body), status
     except Exception as e:
         return jsonify({'error': str(e)}), 503
 
 
 @app.route('/api/prometheus/query_range', methods=['GET'])
 def prometheus_query_range():
-    """Proxy a Prometheus range query. Params: query, start, end, step"""
+    """Proxy a Prometheus range query through the shared cache. Params: query, start, end, step"""
     q = request.args.get('query')
     start = request.args.get('start')
     end = request.args.get('end')
@@ -234,18 +676,317 @@ def prometheus_query_range():
     if not q or not start or not end:
         return jsonify({'error': 'missing query/start/end parameters'}), 400
     try:
-        params = {'query': q, 'start': start, 'end': end, 'step': step}
-        r = requests.get(f"{PROMETHEUS_URL}/api/v1/query_range", params=params, timeout=10)
-        return jsonify(r.json()), r.status_code
+        start, end, step = parse_prometheus_time(start), parse_prometheus_time(end), parse_prometheus_duration(step)
+        if end < start:
+            raise ValueError('end must not be before start')
+    except ValueError as e:
+        return jsonify({'error': f'invalid start/end/step: {e}'}), 400
+    if (end - start) / step >= PROMETHEUS_MAX_POINTS:
+        return jsonify({'error': 'too many points; increase step or narrow the range'}), 400
+    try:
+        status, body = prometheus_cache.query_range(q, start, end, step)
+        return jsonify(body), status
     except Exception as e:
         return jsonify({'error': str(e)}), 503
 
+# ==================== Dashboard ====================
+
+DASHBOARD_MAX_QUERIES = 20
+DASHBOARD_DEFAULT_WIDTH = 600
+DASHBOARD_MIN_STEP = 15  # seconds; finer than the scrape interval only repeats samples
+dashboard_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='dashboard')
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets: keep `threshold` points that preserve the visual shape"""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return points
+    sampled = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        # The next bucket's average stands in for the point that will be picked there
+        next_bucket = points[end:next_end]
+        avg_t = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_v = sum(p[1] for p in next_bucket) / len(next_bucket)
+        a_t, a_v = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((a_t - avg_t) * (points[j][1] - a_v) - (a_t - points[j][0]) * (avg_v - a_v))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+def minmax_downsample(points, width):
+    """Keep each bucket's min and max (in time order) so spikes survive; about `width` points"""
+    buckets = max(width // 2, 1)
+    n = len(points)
+    if n <= width:
+        return points
+    sampled = []
+    for i in range(buckets):
+        bucket = points[i * n // buckets:(i + 1) * n // buckets]
+        if not bucket:
+            continue
+        low = min(range(len(bucket)), key=lambda k: bucket[k][1])
+        high = max(range(len(bucket)), key=lambda k: bucket[k][1])
+        sampled.extend(bucket[k] for k in sorted({low, high}))
+    return sampled
+
+DOWNSAMPLERS = {'lttb': lttb, 'minmax': minmax_downsample}
+
+def parse_sample(value):
+    """Prometheus sample value string to a JSON-safe float (None for NaN/Inf)"""
+    number = float(value)
+    return number if math.isfinite(number) else None
+
+def run_dashboard_panel(panel, start, end, step, width, method):
+    """Evaluate one named query via the shared cache and return its compact, downsampled series"""
+    try:
+        if panel['type'] == 'instant':
+            status, body = prometheus_cache.query(panel['query'])
+        else:
+            status, body = prometheus_cache.query_range(panel['query'], start, end, step)
+    except Exception as e:
+        return {'status': 'error', 'error': str(e)}
+    if status != 200 or body.get('status') != 'success':
+        return {'status': 'error', 'error': body.get('error', f'Prometheus returned {status}')}
+
+    data = body['data']
+    series = []
+    points_in = points_out = 0
+    if data['resultType'] == 'matrix':
+        for result in data['result']:
+            points = [(ts, v) for ts, v in ((ts, parse_sample(raw)) for ts, raw in result['values']) if v is not None]
+            sampled = DOWNSAMPLERS[method](points, width)
+            points_in += len(result['values'])
+            points_out += len(sampled)
+            series.append({'metric': result['metric'], 't': [p[0] for p in sampled], 'v': [p[1] for p in sampled]})
+    elif data['resultType'] == 'vector':
+        series = [{'metric': r['metric'], 't': r['value'][0], 'v': parse_sample(r['value'][1])} for r in data['result']]
+    else:  # scalar or string
+        series = [{'metric': {}, 't': data['result'][0], 'v': parse_sample(data['result'][1])}]
+    return {'status': 'success', 'series': series, 'points_in': points_in, 'points_out': points_out}
+
+@app.route('/api/dashboard', methods=['POST'])
+def dashboard():
+    """Run a dashboard spec's named queries concurrently and return downsampled series in one payload.
+
+    Body: {"queries": [{"name", "query", "type": "range"|"instant"}], "start", "end", "step",
+    "width", "method": "lttb"|"minmax"}
+    """
+    spec = request.get_json(silent=True)
+    if not isinstance(spec, dict):
+        return jsonify({'error': 'dashboard spec must be a JSON object'}), 400
+    panels = spec.get('queries')
+    if not isinstance(panels, list) or not 0 < len(panels) <= DASHBOARD_MAX_QUERIES:
+        return jsonify({'error': f'queries must be a list of 1-{DASHBOARD_MAX_QUERIES} panels'}), 400
+    if any(not isinstance(p, dict) or not isinstance(p.get('name'), str) or not isinstance(p.get('query'), str)
+           or not p['name'] or not p['query'] for p in panels):
+        return jsonify({'error': 'every query needs a name and a query string'}), 400
+    if any(p.get('type', 'range') not in ('range', 'instant') for p in panels):
+        return jsonify({'error': 'query type must be range or instant'}), 400
+    if len({p['name'] for p in panels}) != len(panels):
+        return jsonify({'error': 'query names must be unique'}), 400
+    method = spec.get('method', 'lttb')
+    if not isinstance(method, str) or method not in DOWNSAMPLERS:
+        return jsonify({'error': 'method must be lttb or minmax'}), 400
+    try:
+        width = min(max(int(spec.get('width', DASHBOARD_DEFAULT_WIDTH)), 10), 5000)
+        end = parse_prometheus_time(str(spec['end'])) if 'end' in spec else time.time()
+        start = parse_prometheus_time(str(spec['start'])) if 'start' in spec else end - 3600
+        if end < start:
+            raise ValueError('end must not be before start')
+        # Default step: as fine as the scrape interval allows without exceeding Prometheus's point limit
+        step = parse_prometheus_duration(str(spec['step'])) if 'step' in spec else \
+            max(DASHBOARD_MIN_STEP, math.ceil((end - start) / (PROMETHEUS_MAX_POINTS - 1)))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'invalid width/start/end/step: {e}'}), 400
+    if (end - start) / step >= PROMETHEUS_MAX_POINTS:
+        return jsonify({'error': 'too many points; increase step or narrow the range'}), 400
+
+    began = time.time()
+    futures = {
+        p['name']: dashboard_executor.submit(run_dashboard_panel, dict(p, type=p.get('type', 'range')),
+                                             start, end, step, width, method)
+        for p in panels
+    }
+    results = {name: future.result() for name, future in futures.items()}
+    dashboard_duration.observe(time.time() - began)
+    return jsonify({
+        'start': start - start % step,
+        'end': end - end % step,
+        'step': step,
+        'width': width,
+        'method': method,
+        'results': results,
+        'duration_ms': round((time.time() - began) * 1000, 1)
+    }), 200
+
+# ==================== Live Metrics Stream ====================
+
+LIVE_METRICS_INTERVAL = float(os.getenv('LIVE_METRICS_INTERVAL_SECONDS', '5'))
+# Every panel of the monitoring page. The page receives this list in the stream's snapshot and sends it
+# back to /api/dashboard for its charts, so the queries are only defined here
+MONITORING_QUERIES = [
+    {'name': 'total_rate', 'type': 'instant', 'query': 'sum(rate(bff_requests_total[5m])) + rate(core_service_requests_total[5m]) + rate(ui_service_requests_total[5m])'},
+    {'name': 'avg_response', 'type': 'instant', 'query': 'avg(bff_request_duration_seconds)'},
+    {'name': 'bff_rate', 'type': 'range', 'query': 'sum by (job) (rate(bff_requests_total[5m]))'},
+    {'name': 'core_rate', 'type': 'range', 'query': 'sum by (job) (rate(core_service_requests_total[5m]))'},
+    {'name': 'ui_rate', 'type': 'range', 'query': 'sum by (job) (rate(ui_service_requests_total[5m]))'},
+    {'name': 'bff_p95', 'type': 'instant', 'query': 'histogram_quantile(0.95, sum(rate(bff_request_duration_seconds_bucket[5m])) by (le)) * 1000'},
+    {'name': 'core_p95', 'type': 'instant', 'query': 'histogram_quantile(0.95, sum(rate(core_service_request_duration_seconds_bucket[5m])) by (le)) * 1000'},
+    {'name': 'ui_p95', 'type': 'instant', 'query': 'histogram_quantile(0.95, sum(rate(ui_service_request_duration_seconds_bucket[5m])) by (le)) * 1000'}
+]
+# Only the stat tiles and the p95 chart are pushed live; the request-rate charts reload once a minute
+LIVE_METRICS_QUERIES = {panel['name']: panel['query'] for panel in MONITORING_QUERIES if panel['type'] == 'instant'}
+
+class LiveSubscriber:
+    """Per-connection pending changes; new changes merge into unsent ones instead of queueing"""
+
+    def __init__(self):
+        self.pending = {}  # event type -> {key: latest value}
+        self.pending_since = None
+        self.ready = threading.Event()
+
+class LiveMetricsHub:
+    """Evaluates the live queries once per interval for all subscribers and pushes only what changed.
+
+    A slow client never blocks the evaluator or grows a backlog: its unsent changes are
+    merged, so it simply receives fewer, larger updates.
+    """
+
+    def __init__(self, queries, interval):
+        self.queries = queries
+        self.interval = interval
+        self.values = {}  # latest value per query name
+        self.health = {}  # latest health entry per target name
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.started = False
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, name='live-metrics', daemon=True).start()
+
+    def subscribe(self):
+        """Register a subscriber and return it with a full snapshot to send first"""
+        self.start()
+        subscriber = LiveSubscriber()
+        with self.lock:
+            self.subscribers.add(subscriber)
+            snapshot = {'metrics': dict(self.values), 'health': dict(self.health)}
+        live_subscribers.inc()
+        return subscriber, snapshot
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+        live_subscribers.dec()
+
+    def publish(self, event_type, changes):
+        now = time.time()
+        with self.lock:
+            for subscriber in self.subscribers:
+                pending = subscriber.pending.setdefault(event_type, {})
+                if pending:
+                    live_updates_coalesced.inc()
+                pending.update(changes)
+                if subscriber.pending_since is None:
+                    subscriber.pending_since = now
+                subscriber.ready.set()
+
+    def take(self, subscriber):
+        """Pop everything pending for a subscriber as (pending_by_type, oldest_change_time)"""
+        with self.lock:
+            pending, since = subscriber.pending, subscriber.pending_since
+            subscriber.pending, subscriber.pending_since = {}, None
+            subscriber.ready.clear()
+        return pending, since
+
+    def evaluate(self):
+        futures = {name: dashboard_executor.submit(prometheus_cache.query, query) for name, query in self.queries.items()}
+        values = {}
+        for name, future in futures.items():
+            try:
+                status, body = future.result()
+                result = body['data']['result'] if status == 200 and body.get('status') == 'success' else None
+            except Exception:
+                result = None
+            if result is None:
+                continue  # keep the last known value through a failed evaluation
+            if body['data']['resultType'] == 'vector':
+                value = parse_sample(result[0]['value'][1]) if result else None
+            else:
+                value = parse_sample(result[1])
+            # Round so float noise does not count as a change
+            values[name] = float(f'{value:.6g}') if value is not None else None
+        health = {entry['name']: entry for entry in health_prober.results()}
+
+        with self.lock:
+            changed = {name: value for name, value in values.items() if self.values.get(name, ...) != value}
+            health_changed = {name: entry for name, entry in health.items()
+                              if (entry['status'], entry['error']) != (self.health.get(name, {}).get('status'), self.health.get(name, {}).get('error'))}
+            self.values.update(values)
+            self.health.update(health)
+        if changed:
+            self.publish('metrics', changed)
+        if health_changed:
+            self.publish('health', health_changed)
+
+    def run(self):
+        health_prober.start()
+        while True:
+            started = time.time()
+            if self.subscribers:
+                try:
+                    self.evaluate()
+                except Exception as e:
+                    print(f"Live metrics evaluation error: {e}")
+                live_evaluation_duration.observe(time.time() - started)
+            time.sleep(max(self.interval - (time.time() - started), 0))
+
+live_metrics = LiveMetricsHub(LIVE_METRICS_QUERIES, LIVE_METRICS_INTERVAL)
+
+@app.route('/api/metrics/stream', methods=['GET'])
+def live_metrics_stream():
+    """Server-sent events: a `snapshot` of every live value and the page's queries, then `metrics`/`health` events with only changes"""
+    subscriber, snapshot = live_metrics.subscribe()
+    snapshot['queries'] = MONITORING_QUERIES
+
+    def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            yield f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+            while True:
+                if not subscriber.ready.wait(15):
+                    yield ': keepalive\n\n'
+                    continue
+                pending, since = live_metrics.take(subscriber)
+                for event_type, changes in pending.items():
+                    yield f"event: {event_type}\ndata: {json.dumps(changes)}\n\n"
+                if since is not None:
+                    live_push_latency.observe(time.time() - since)
+        finally:
+            live_metrics.unsubscribe(subscriber)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/inventory', methods=['GET'])
 def proxy_inventory():
     """Proxy inventory endpoint to BFF service"""
     try:
-        response = requests.get(f'{BFF_SERVICE_URL}/api/inventory', timeout=5)
-        return jsonify(response.json()), response.status_code
+        return proxy_conditional_get(f'{BFF_SERVICE_URL}/api/inventory')
     except Exception as e:
         return jsonify({'error': str(e)}), 503
 
@@ -253,13 +994,42 @@ def proxy_inventory():
 def proxy_orders():
     """Proxy orders endpoint to BFF service"""
     try:
+        headers = {name: request.headers[name] for name in ('Idempotency-Key', 'Authorization') if name in request.headers}
         if request.method == 'POST':
-            response = requests.post(f'{BFF_SERVICE_URL}/api/orders', json=request.json, timeout=5)
+            response = bff_session.post(f'{BFF_SERVICE_URL}/api/orders', json=request.json, headers=headers, timeout=5)
         else:
-            response = requests.get(f'{BFF_SERVICE_URL}/api/orders', timeout=5)
+            response = bff_session.get(f'{BFF_SERVICE_URL}/api/orders', params=request.args, headers=headers, timeout=5)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 503
 
+@app.route('/api/orders/events', methods=['GET'])
+def order_events():
+    """Relay the order event stream (server-sent events) without buffering"""
+    try:
+        headers = {'Last-Event-ID': request.headers.get('Last-Event-ID', '')}
+        if 'Authorization' in request.headers:
+            headers['Authorization'] = request.headers['Authorization']
+        upstream = bff_session.get(f'{BFF_SERVICE_URL}/api/orders/events', headers=headers, params=request.args, stream=True, timeout=(5, 60))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 503
+
+    def relay():
+        try:
+            for chunk in upstream.iter_content(chunk_size=None):
+                yield chunk
+        except requests.RequestException:
+            pass  # Upstream went quiet or away; the browser reconnects with Last-Event-ID
+        finally:
+            upstream.close()
+
+    return Response(relay(), upstream.status_code, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# ==================== Sampling Profiler ====================
+
+init_profiling(app, tracer.service_name, caller_is_admin)
+
 if __name__ == '__main__':
+    health_prober.start()
     app.run(host='0.0.0.0', port=5002, debug=False)
@@ -29,6 +29,8 @@ $env:AUTH_SERVICE_URL = "http://127.0.0.1:5003"
 $env:BFF_SERVICE_URL = "http://127.0.0.1:5000"
 $env:CUSTOMER_MGMT_URL = "http://127.0.0.1:5004"
 $env:CORE_SERVICE_URL = "http://127.0.0.1:5001" 
+# Services import the shared modules in services\common
+$env:PYTHONPATH = "$StartPath"
 
 Write-Host "Starting Auth Service..."
 $authProcess = Start-Process -FilePath $PythonExe -ArgumentList """$StartPath\auth-service\main.py""" -PassThru -NoNewWindow -RedirectStandardOutput "$LogPath\auth.log" -RedirectStandardError "$LogPath\auth.err"